@@ -6,9 +6,14 @@
 """
 
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
 import pandas as pd
 
+# 台股交易所時區（開收盤判斷一律以台北時間為準）
+TAIPEI_TZ = ZoneInfo("Asia/Taipei")
+
 
 class IStockDataFetcher(ABC):
     """
@@ -24,6 +29,9 @@ class IStockDataFetcher(ABC):
         - MockDataFetcher (測試用)
     """
 
+    # 不建立 __dict__，讓實作類別可使用 __slots__
+    __slots__ = ()
+
     @abstractmethod
     def get_stock_price(self, stock_id: str, days: int = 90) -> pd.DataFrame:
         """
@@ -128,14 +136,15 @@ class IStockDataFetcher(ABC):
             True 表示市場開盤中，False 表示已收盤
 
         Note:
-            此方法有預設實作，子類可選擇覆寫
+            此方法有預設實作，子類可選擇覆寫。
+            以台北時間判斷，與伺服器所在時區無關。
         """
-        from datetime import datetime
-        now = datetime.now()
+        now = datetime.now(TAIPEI_TZ)
         # 簡化判斷：週一到週五 09:00-13:30
-        is_weekday = now.weekday() < 5
-        is_trading_hours = (9 <= now.hour < 13) or (now.hour == 13 and now.minute <= 30)
-        return is_weekday and is_trading_hours
+        if now.weekday() >= 5:
+            return False
+        t = now.hour * 60 + now.minute
+        return 9 * 60 <= t <= 13 * 60 + 30
 
 
 class IWarrantDataFetcher(ABC):
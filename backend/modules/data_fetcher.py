@@ -6,11 +6,34 @@
 import pandas as pd
 import numpy as np
 import requests
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
 import warnings
 import logging
+import json
 import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+
+from cachetools import LRUCache, TTLCache
+
+from backend.interfaces.data_fetcher_interface import IStockDataFetcher, TAIPEI_TZ
+from backend.utils.executors import IO_POOL, REFRESH_POOL
+from backend.utils.yf_loader import get_yf
+
+# 有安裝 orjson 時以其解析 API 回應（直接讀 bytes，較快），否則使用標準函式庫
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 # 完全抑制所有警告
 warnings.filterwarnings('ignore')
@@ -20,145 +43,623 @@ os.environ['PYTHONWARNINGS'] = 'ignore'
 for logger_name in ['yfinance', 'peewee', 'urllib3', 'requests', 'apscheduler']:
     logging.getLogger(logger_name).setLevel(logging.CRITICAL)
 
-# 導入 yfinance
-_yf_available = False
-try:
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        import yfinance as yf
-        _yf_available = True
-except:
-    pass
-
-
-class TaiwanStockDataFetcher:
+logger = logging.getLogger(__name__)
+
+# 單一後綴查詢可預期的失敗：連線錯誤（requests 與 curl_cffi 的例外皆為 OSError 子類別）、
+# yfinance 自身例外與回應格式不符；其他例外不在迴圈內吞掉
+_FETCH_ERRORS = (OSError, KeyError, ValueError, TypeError)
+
+
+def _get_yf():
+    """回傳 yfinance 模組（與其他資料獲取器共用的延遲載入），並將其例外加入 _FETCH_ERRORS"""
+    global _FETCH_ERRORS
+    yf = get_yf()
+    if yf is not None and yf.exceptions.YFException not in _FETCH_ERRORS:
+        _FETCH_ERRORS += (yf.exceptions.YFException,)
+    return yf
+
+
+# 台股代碼格式：4~6 位數字，ETF 可帶一個英文字母（如 00679B、00632R）
+_STOCK_ID_RE = re.compile(r'\d{4,6}[A-Z]?')
+
+# 本機快取目錄（價格歷史以 Parquet 保存，重啟後可沿用）
+_CACHE_DIR = Path.home() / '.cache' / 'stock_analyzer'
+
+# Yahoo 欄位 -> 中文欄位
+_COL_MAP = MappingProxyType({
+    'Open': '開盤價', 'High': '最高價', 'Low': '最低價', 'Close': '收盤價', 'Volume': '成交量'
+})
+_PRICE_COLS = list(_COL_MAP.values())
+# 中文欄位 -> 陣列版本鍵名（get_stock_price_soa）
+_SOA_KEYS = MappingProxyType({v: k.lower() for k, v in _COL_MAP.items()})
+
+
+# 股票完整資訊對照表（唯讀，所有實例共用）
+_STOCK_INFO_DB = MappingProxyType({
+    # 半導體
+    '2330': {'name': '台積電', 'sector': '科技業', 'industry': '半導體'},
+    '2454': {'name': '聯發科', 'sector': '科技業', 'industry': '半導體'},
+    '2303': {'name': '聯電', 'sector': '科技業', 'industry': '半導體'},
+    '3711': {'name': '日月光投控', 'sector': '科技業', 'industry': '半導體'},
+    '2379': {'name': '瑞昱', 'sector': '科技業', 'industry': '半導體'},
+    '3034': {'name': '聯詠', 'sector': '科技業', 'industry': '半導體'},
+    '2344': {'name': '華邦電', 'sector': '科技業', 'industry': '半導體'},
+    # 電子
+    '2317': {'name': '鴻海', 'sector': '科技業', 'industry': '電子製造'},
+    '2308': {'name': '台達電', 'sector': '科技業', 'industry': '電子零組件'},
+    '2382': {'name': '廣達', 'sector': '科技業', 'industry': '電腦及週邊'},
+    '2357': {'name': '華碩', 'sector': '科技業', 'industry': '電腦及週邊'},
+    '2353': {'name': '宏碁', 'sector': '科技業', 'industry': '電腦及週邊'},
+    '3008': {'name': '大立光', 'sector': '科技業', 'industry': '光電'},
+    '2395': {'name': '研華', 'sector': '科技業', 'industry': '工業電腦'},
+    '2354': {'name': '鴻準', 'sector': '科技業', 'industry': '機殼'},
+    '2474': {'name': '可成', 'sector': '科技業', 'industry': '機殼'},
+    '2327': {'name': '國巨', 'sector': '科技業', 'industry': '被動元件'},
+    '3231': {'name': '緯創', 'sector': '科技業', 'industry': '電腦及週邊'},
+    '2324': {'name': '仁寶', 'sector': '科技業', 'industry': '電腦及週邊'},
+    '2301': {'name': '光寶科', 'sector': '科技業', 'industry': '電源供應器'},
+    '2356': {'name': '英業達', 'sector': '科技業', 'industry': '電腦及週邊'},
+    '2347': {'name': '聯強', 'sector': '科技業', 'industry': '通路'},
+    '2409': {'name': '友達', 'sector': '科技業', 'industry': '面板'},
+    '3481': {'name': '群創', 'sector': '科技業', 'industry': '面板'},
+    # 金融
+    '2882': {'name': '國泰金', 'sector': '金融業', 'industry': '金控'},
+    '2881': {'name': '富邦金', 'sector': '金融業', 'industry': '金控'},
+    '2886': {'name': '兆豐金', 'sector': '金融業', 'industry': '金控'},
+    '2891': {'name': '中信金', 'sector': '金融業', 'industry': '金控'},
+    '2885': {'name': '元大金', 'sector': '金融業', 'industry': '金控'},
+    '2884': {'name': '玉山金', 'sector': '金融業', 'industry': '金控'},
+    '2883': {'name': '開發金', 'sector': '金融業', 'industry': '金控'},
+    '2880': {'name': '華南金', 'sector': '金融業', 'industry': '金控'},
+    '2887': {'name': '台新金', 'sector': '金融業', 'industry': '金控'},
+    '2890': {'name': '永豐金', 'sector': '金融業', 'industry': '金控'},
+    '2892': {'name': '第一金', 'sector': '金融業', 'industry': '金控'},
+    '5880': {'name': '合庫金', 'sector': '金融業', 'industry': '金控'},
+    # 傳產
+    '1301': {'name': '台塑', 'sector': '塑膠業', 'industry': '塑膠'},
+    '1303': {'name': '南亞', 'sector': '塑膠業', 'industry': '塑膠'},
+    '1326': {'name': '台化', 'sector': '塑膠業', 'industry': '塑膠'},
+    '6505': {'name': '台塑化', 'sector': '塑膠業', 'industry': '石化'},
+    '2002': {'name': '中鋼', 'sector': '鋼鐵業', 'industry': '鋼鐵'},
+    '2207': {'name': '和泰車', 'sector': '汽車業', 'industry': '汽車'},
+    '2912': {'name': '統一超', 'sector': '零售業', 'industry': '超商'},
+    '1216': {'name': '統一', 'sector': '食品業', 'industry': '食品'},
+    '2105': {'name': '正新', 'sector': '橡膠業', 'industry': '輪胎'},
+    # 航運
+    '2603': {'name': '長榮', 'sector': '航運業', 'industry': '貨櫃航運'},
+    '2609': {'name': '陽明', 'sector': '航運業', 'industry': '貨櫃航運'},
+    '2615': {'name': '萬海', 'sector': '航運業', 'industry': '貨櫃航運'},
+    '2618': {'name': '長榮航', 'sector': '航運業', 'industry': '航空'},
+    # 通訊
+    '2412': {'name': '中華電', 'sector': '通訊業', 'industry': '電信'},
+    '3045': {'name': '台灣大', 'sector': '通訊業', 'industry': '電信'},
+    '4904': {'name': '遠傳', 'sector': '通訊業', 'industry': '電信'},
+    # ETF
+    '0050': {'name': '元大台灣50', 'sector': 'ETF', 'industry': '指數型'},
+    '0056': {'name': '元大高股息', 'sector': 'ETF', 'industry': '高股息'},
+    '00878': {'name': '國泰永續高股息', 'sector': 'ETF', 'industry': '高股息'},
+    '00881': {'name': '國泰台灣5G+', 'sector': 'ETF', 'industry': '主題型'},
+    '006208': {'name': '富邦台50', 'sector': 'ETF', 'industry': '指數型'},
+})
+
+# 市值顯示單位：_MC_THRESHOLDS 以 bisect 找出區間，再取 (除數, 格式)
+_MC_THRESHOLDS = (1e8, 1e12)
+_MC_BUCKETS = ((1, '{:,.0f}'), (1e8, '{:.2f} 億'), (1e12, '{:.2f} 兆'))
+
+# 本地資料庫已收錄的代碼，O(1) 查詢
+_STOCK_IDS = frozenset(_STOCK_INFO_DB)
+
+# 已收錄的 ETF：Yahoo 不提供本益比等基本面，不必查詢 info
+_ETF_IDS = frozenset(sid for sid, data in _STOCK_INFO_DB.items() if data['sector'] == 'ETF')
+
+# 同一份資料的欄位式表格（索引為股票代碼），供依產業篩選等整批操作
+_STOCK_INFO_DF = pd.DataFrame.from_dict(_STOCK_INFO_DB, orient='index')
+_STOCK_INFO_DF.index.name = '股票代碼'
+# 產業欄位重複度高，以類別型態儲存，篩選時比對整數代碼
+_STOCK_INFO_DF = _STOCK_INFO_DF.astype({'sector': 'category', 'industry': 'category'})
+
+# 熱門股票清單
+_TOP_STOCKS = ('2330', '2317', '2454', '2412', '2882', '2881', '2886', '2891', '2303', '2308')
+
+
+def _valid_stock_id(stock_id: str) -> bool:
+    """已收錄的代碼直接通過，其餘以格式檢查"""
+    return stock_id in _STOCK_IDS or bool(_STOCK_ID_RE.fullmatch(stock_id or ''))
+
+
+def _lookback_days(days: int) -> int:
+    """
+    取得 days 筆日K所需回溯的日曆天數
+
+    以每週 5 個交易日換算，另加 12 天容納春節等連假；不超過原本固定的
+    days + 30，長區間查詢的涵蓋範圍不變。
+    """
+    return min(days + 30, -(-days * 7 // 5) + 12)
+
+
+def _last_market_close(now: datetime) -> datetime:
+    """回傳 now 之前最近一次收盤時間（週一至週五 13:30，台北時間）"""
+    close = now.replace(hour=13, minute=30, second=0, microsecond=0)
+    if now < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+
+class TaiwanStockDataFetcher(IStockDataFetcher):
     """台灣股票資料獲取器 - 100% Yahoo Finance 真實資料"""
 
-    def __init__(self):
-        # 股票完整資訊對照表
-        self.stock_info_db = {
-            # 半導體
-            '2330': {'name': '台積電', 'sector': '科技業', 'industry': '半導體'},
-            '2454': {'name': '聯發科', 'sector': '科技業', 'industry': '半導體'},
-            '2303': {'name': '聯電', 'sector': '科技業', 'industry': '半導體'},
-            '3711': {'name': '日月光投控', 'sector': '科技業', 'industry': '半導體'},
-            '2379': {'name': '瑞昱', 'sector': '科技業', 'industry': '半導體'},
-            '3034': {'name': '聯詠', 'sector': '科技業', 'industry': '半導體'},
-            '2344': {'name': '華邦電', 'sector': '科技業', 'industry': '半導體'},
-            # 電子
-            '2317': {'name': '鴻海', 'sector': '科技業', 'industry': '電子製造'},
-            '2308': {'name': '台達電', 'sector': '科技業', 'industry': '電子零組件'},
-            '2382': {'name': '廣達', 'sector': '科技業', 'industry': '電腦及週邊'},
-            '2357': {'name': '華碩', 'sector': '科技業', 'industry': '電腦及週邊'},
-            '2353': {'name': '宏碁', 'sector': '科技業', 'industry': '電腦及週邊'},
-            '3008': {'name': '大立光', 'sector': '科技業', 'industry': '光電'},
-            '2395': {'name': '研華', 'sector': '科技業', 'industry': '工業電腦'},
-            '2354': {'name': '鴻準', 'sector': '科技業', 'industry': '機殼'},
-            '2474': {'name': '可成', 'sector': '科技業', 'industry': '機殼'},
-            '2327': {'name': '國巨', 'sector': '科技業', 'industry': '被動元件'},
-            '3231': {'name': '緯創', 'sector': '科技業', 'industry': '電腦及週邊'},
-            '2324': {'name': '仁寶', 'sector': '科技業', 'industry': '電腦及週邊'},
-            '2301': {'name': '光寶科', 'sector': '科技業', 'industry': '電源供應器'},
-            '2356': {'name': '英業達', 'sector': '科技業', 'industry': '電腦及週邊'},
-            '2347': {'name': '聯強', 'sector': '科技業', 'industry': '通路'},
-            '2409': {'name': '友達', 'sector': '科技業', 'industry': '面板'},
-            '3481': {'name': '群創', 'sector': '科技業', 'industry': '面板'},
-            # 金融
-            '2882': {'name': '國泰金', 'sector': '金融業', 'industry': '金控'},
-            '2881': {'name': '富邦金', 'sector': '金融業', 'industry': '金控'},
-            '2886': {'name': '兆豐金', 'sector': '金融業', 'industry': '金控'},
-            '2891': {'name': '中信金', 'sector': '金融業', 'industry': '金控'},
-            '2885': {'name': '元大金', 'sector': '金融業', 'industry': '金控'},
-            '2884': {'name': '玉山金', 'sector': '金融業', 'industry': '金控'},
-            '2883': {'name': '開發金', 'sector': '金融業', 'industry': '金控'},
-            '2880': {'name': '華南金', 'sector': '金融業', 'industry': '金控'},
-            '2887': {'name': '台新金', 'sector': '金融業', 'industry': '金控'},
-            '2890': {'name': '永豐金', 'sector': '金融業', 'industry': '金控'},
-            '2892': {'name': '第一金', 'sector': '金融業', 'industry': '金控'},
-            '5880': {'name': '合庫金', 'sector': '金融業', 'industry': '金控'},
-            # 傳產
-            '1301': {'name': '台塑', 'sector': '塑膠業', 'industry': '塑膠'},
-            '1303': {'name': '南亞', 'sector': '塑膠業', 'industry': '塑膠'},
-            '1326': {'name': '台化', 'sector': '塑膠業', 'industry': '塑膠'},
-            '6505': {'name': '台塑化', 'sector': '塑膠業', 'industry': '石化'},
-            '2002': {'name': '中鋼', 'sector': '鋼鐵業', 'industry': '鋼鐵'},
-            '2207': {'name': '和泰車', 'sector': '汽車業', 'industry': '汽車'},
-            '2912': {'name': '統一超', 'sector': '零售業', 'industry': '超商'},
-            '1216': {'name': '統一', 'sector': '食品業', 'industry': '食品'},
-            '2105': {'name': '正新', 'sector': '橡膠業', 'industry': '輪胎'},
-            # 航運
-            '2603': {'name': '長榮', 'sector': '航運業', 'industry': '貨櫃航運'},
-            '2609': {'name': '陽明', 'sector': '航運業', 'industry': '貨櫃航運'},
-            '2615': {'name': '萬海', 'sector': '航運業', 'industry': '貨櫃航運'},
-            '2618': {'name': '長榮航', 'sector': '航運業', 'industry': '航空'},
-            # 通訊
-            '2412': {'name': '中華電', 'sector': '通訊業', 'industry': '電信'},
-            '3045': {'name': '台灣大', 'sector': '通訊業', 'industry': '電信'},
-            '4904': {'name': '遠傳', 'sector': '通訊業', 'industry': '電信'},
-            # ETF
-            '0050': {'name': '元大台灣50', 'sector': 'ETF', 'industry': '指數型'},
-            '0056': {'name': '元大高股息', 'sector': 'ETF', 'industry': '高股息'},
-            '00878': {'name': '國泰永續高股息', 'sector': 'ETF', 'industry': '高股息'},
-            '00881': {'name': '國泰台灣5G+', 'sector': 'ETF', 'industry': '主題型'},
-            '006208': {'name': '富邦台50', 'sector': 'ETF', 'industry': '指數型'},
-        }
-        self._cache = {}  # 快取
-
-    def get_stock_price(self, stock_id: str, days: int = 30) -> pd.DataFrame:
+    # 價格快取設定（秒／最大筆數）
+    CACHE_TTL = 300
+    CACHE_MAX_ENTRIES = 1024
+    # 記憶體中保留的價格歷史檔數上限（完整資料以 Parquet 保存於本機）
+    HISTORY_MAX_ENTRIES = 256
+    # 每次下載至少涵蓋的日曆天數（52 週資訊與短期查詢共用）
+    MAX_HISTORY_DAYS = 400
+    # 基本面（本益比、市值等）變動緩慢，快取一天
+    FUNDAMENTALS_TTL = 86400
+    # 收盤報價保留秒數；過期後改由價格資料重新組出
+    QUOTE_TTL = 86400
+    # 單次 Yahoo 請求逾時秒數，避免 .TW / .TWO 兩次嘗試各卡住 10 秒
+    YF_TIMEOUT = 3
+    # 多檔下載每批代碼數上限（避免 URL 過長被拒）
+    BATCH_SIZE = 20
+    # 查無價格的代碼在此秒數內不再連線（下市、代碼錯誤或暫時被限流）
+    MISS_TTL = 60
+
+    __slots__ = (
+        'stock_info_db', 'stock_info_df', '_cache', '_cache_lock', '_history', '_cache_dir', '_suffix_lock',
+        '_suffix_cache', '_quotes', '_db_lock', '_db', '_fundamentals', '_refreshing',
+    )
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.stock_info_db = _STOCK_INFO_DB  # 單筆查詢
+        self.stock_info_df = _STOCK_INFO_DF  # 整批篩選（唯讀共用，勿修改）
+        # 價格快取：CACHE_TTL 內為新鮮資料，之後到兩倍 TTL 前仍可先回傳舊資料
+        # 並在背景更新；超過兩倍 TTL 或超過上限時自動淘汰（LRU）
+        self._cache = TTLCache(maxsize=self.CACHE_MAX_ENTRIES, ttl=2 * self.CACHE_TTL)
+        self._cache_lock = threading.Lock()  # TTLCache 非執行緒安全
+        # 正在背景更新的代碼，避免重複送出
+        self._refreshing: set = set()
+        # 基本面快取：info_{stock_id} -> Yahoo info 中用到的欄位（與 _cache 共用鎖）
+        self._fundamentals = TTLCache(maxsize=self.CACHE_MAX_ENTRIES, ttl=self.FUNDAMENTALS_TTL)
+        # 價格歷史：stock_id -> (DataFrame, {'min_date', 'max_date', 'synced'})，
+        # 超過上限時淘汰最久未用者，之後由 Parquet 檔讀回（與 _cache 共用鎖）
+        self._history = LRUCache(maxsize=self.HISTORY_MAX_ENTRIES)
+        self._cache_dir = Path(cache_dir) if cache_dir else _CACHE_DIR
+        # 即時報價：stock_id -> (所用價格資料的下載時間 time.monotonic(), 報價)，
+        # 收盤後下載的資料所組出的報價沿用到下次開盤（與 _cache 共用鎖）
+        self._quotes = TTLCache(maxsize=self.CACHE_MAX_ENTRIES, ttl=self.QUOTE_TTL)
+        # 股票資訊持久快取（SQLite），重啟後仍可使用
+        self._db_lock = threading.Lock()
+        self._db = self._open_db()
+        # 股票代碼 -> 市場後綴（.TW 上市 / .TWO 上櫃），成功查詢後寫回磁碟
+        self._suffix_lock = threading.Lock()
+        self._suffix_cache: Dict[str, str] = self._load_suffix_map()
+
+    @staticmethod
+    def is_known_stock(stock_id: str) -> bool:
+        """代碼是否收錄於本地股票資料庫"""
+        return stock_id in _STOCK_IDS
+
+    def get_stock_price(self, stock_id: str, days: int = 30,
+                        force_refresh: bool = False) -> pd.DataFrame:
         """
         獲取股票歷史價格 - 100% 來自 Yahoo Finance
+
+        每檔股票只快取一份至少 MAX_HISTORY_DAYS 天的歷史，不同天數的查詢
+        都由同一份資料切出；已下載過的區間會保留在本機，之後只補抓缺少的日期。
+
+        Args:
+            stock_id: 股票代碼
+            days: 查詢天數
+            force_refresh: 略過記憶體快取，並一定重抓最後一天
         """
-        if not _yf_available:
+        if not _valid_stock_id(stock_id) or _get_yf() is None:
             return pd.DataFrame()
 
-        # 檢查快取
-        cache_key = f"price_{stock_id}_{days}"
-        if cache_key in self._cache:
-            cached_time, cached_data = self._cache[cache_key]
-            if (datetime.now() - cached_time).seconds < 300:  # 5分鐘快取
-                return cached_data
+        end = datetime.now()
+        start = end - timedelta(days=_lookback_days(days))
+
+        # 檢查快取：(涵蓋起點, 價格歷史, 寫入時間)
+        cache_key = f"price_{stock_id}_max"
+        cached = None if force_refresh else self._get_cached_price(stock_id)
+
+        if cached is None or cached[0] > start:
+            # 最近才查無資料的代碼直接回傳空結果，不再重試兩個後綴
+            miss_key = f"price_miss_{stock_id}"
+            with self._cache_lock:
+                missed_at = self._cache.get(miss_key)
+            if (missed_at is not None and not force_refresh
+                    and time.monotonic() - missed_at < self.MISS_TTL):
+                return pd.DataFrame()
 
+            try:
+                fetch_start = min(start, end - timedelta(days=self.MAX_HISTORY_DAYS))
+                df = self._update_history(stock_id, fetch_start, end, force_refresh)
+            except Exception:
+                df = pd.DataFrame()
+            if df.empty:
+                with self._cache_lock:
+                    self._cache[miss_key] = time.monotonic()
+                return pd.DataFrame()
+            cached = (fetch_start, df, time.monotonic())
+            with self._cache_lock:
+                self._cache[cache_key] = cached
+                self._cache.pop(miss_key, None)
+
+        df = cached[1]
+        return df.iloc[df.index.searchsorted(pd.Timestamp(start.date())):].tail(days)
+
+    def _get_cached_price(self, stock_id: str) -> Optional[Tuple[datetime, pd.DataFrame, float]]:
+        """讀取價格快取；超過 CACHE_TTL 的項目照常回傳，同時在背景更新"""
+        with self._cache_lock:
+            cached = self._cache.get(f"price_{stock_id}_max")
+        if cached is not None and time.monotonic() - cached[2] > self.CACHE_TTL:
+            with self._cache_lock:
+                if stock_id in self._refreshing:
+                    return cached
+                self._refreshing.add(stock_id)
+            REFRESH_POOL.submit(self._refresh_price, stock_id, cached[0])
+        return cached
+
+    def _refresh_price(self, stock_id: str, fetch_start: datetime):
+        """背景更新價格快取（失敗時保留舊資料，待兩倍 TTL 後自然淘汰）"""
         try:
-            end = datetime.now()
-            start = end - timedelta(days=days + 30)
-
-            for sfx in ['.TW', '.TWO']:
-                ticker_symbol = f"{stock_id}{sfx}"
-                try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        df = yf.download(
-                            ticker_symbol,
-                            start=start,
-                            end=end,
-                            progress=False,
-                            auto_adjust=True,
-                            threads=False
-                        )
-
-                    if df is not None and len(df) > 3:
-                        if isinstance(df.columns, pd.MultiIndex):
-                            df.columns = df.columns.droplevel(1)
-
-                        df = df.rename(columns={
-                            'Open': '開盤價', 'High': '最高價',
-                            'Low': '最低價', 'Close': '收盤價', 'Volume': '成交量'
-                        })
-                        if '開盤價' in df.columns:
-                            result = df[['開盤價', '最高價', '最低價', '收盤價', '成交量']].tail(days)
-                            self._cache[cache_key] = (datetime.now(), result)
-                            return result
-                except Exception:
-                    continue
+            df = self._update_history(stock_id, fetch_start, datetime.now())
+            if not df.empty:
+                with self._cache_lock:
+                    self._cache[f"price_{stock_id}_max"] = (fetch_start, df, time.monotonic())
         except Exception:
             pass
+        finally:
+            with self._cache_lock:
+                self._refreshing.discard(stock_id)
+
+    def get_stock_price_soa(self, stock_id: str, days: int = 30) -> Dict[str, np.ndarray]:
+        """
+        獲取股票歷史價格（欄位陣列版本）
+
+        供只需要逐欄計算的呼叫端使用，省去 DataFrame 的索引與對齊成本。
+
+        Returns:
+            {'date', 'open', 'high', 'low', 'close', 'volume'} -> 連續的 NumPy 陣列
+            （價格與成交量為 float64），取不到資料時為空 dict
+        """
+        df = self.get_stock_price(stock_id, days)
+        if df.empty:
+            return {}
+
+        out = {'date': df.index.to_numpy()}
+        for col, key in _SOA_KEYS.items():
+            out[key] = df[col].to_numpy(dtype=np.float64)
+        return out
+
+    def get_stock_prices(self, stock_ids: List[str], days: int = 30) -> Dict[str, pd.DataFrame]:
+        """
+        同時獲取多檔股票歷史價格
+
+        各代碼的下載以執行緒池並行，總耗時約為單次往返時間。
+
+        Args:
+            stock_ids: 股票代碼列表
+            days: 查詢天數
+
+        Returns:
+            stock_id -> 價格 DataFrame（取不到資料者為空 DataFrame）
+        """
+        stock_ids = list(dict.fromkeys(stock_ids))
+        if not stock_ids:
+            return {}
+
+        frames = IO_POOL.map(lambda sid: self.get_stock_price(sid, days), stock_ids)
+        return dict(zip(stock_ids, frames))
+
+    def _load_suffix_map(self) -> Dict[str, str]:
+        try:
+            with open(self._cache_dir / 'suffix_map.json', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _suffixes(self, stock_id: str) -> List[str]:
+        """回傳要嘗試的後綴；已知市場別者優先，查無資料時（如轉上市櫃）才改查另一個"""
+        if self._suffix_cache.get(stock_id) == '.TWO':
+            return ['.TWO', '.TW']
+        return ['.TW', '.TWO']
+
+    def _remember_suffix(self, stock_id: str, sfx: str):
+        """記錄查詢成功的後綴並寫回磁碟"""
+        if self._suffix_cache.get(stock_id) == sfx:
+            return
+        with self._suffix_lock:
+            self._suffix_cache[stock_id] = sfx
+            try:
+                self._cache_dir.mkdir(parents=True, exist_ok=True)
+                with open(self._cache_dir / 'suffix_map.json', 'w', encoding='utf-8') as f:
+                    json.dump(self._suffix_cache, f)
+            except OSError:
+                pass
+
+    def _download(self, stock_id: str, start: datetime, end: datetime,
+                  min_rows: int = 1) -> pd.DataFrame:
+        """
+        從 Yahoo Finance 下載指定區間的 OHLCV（依序嘗試 .TW / .TWO）
+
+        Args:
+            stock_id: 股票代碼
+            start: 起始時間
+            end: 結束時間
+            min_rows: 視為有效結果的最少筆數
+
+        Returns:
+            中文欄位的價格 DataFrame，失敗時為空
+        """
+        yf = _get_yf()
+        if yf is None:
+            return pd.DataFrame()
+
+        for sfx in self._suffixes(stock_id):
+            ticker_symbol = f"{stock_id}{sfx}"
+            try:
+                # actions=False：不取股利／分割欄位，只留 OHLCV
+                df = yf.Ticker(ticker_symbol).history(
+                    start=start,
+                    end=end,
+                    auto_adjust=True,
+                    actions=False,
+                    timeout=self.YF_TIMEOUT
+                )
+
+                if df is not None and len(df) >= min_rows:
+                    # history() 的索引帶交易所時區，統一轉為無時區日期
+                    if df.index.tz is not None:
+                        df.index = df.index.tz_localize(None)
+
+                    if 'Open' in df.columns:
+                        prices = self._to_price_frame(df)
+                        self._remember_suffix(stock_id, sfx)
+                        return prices
+            except _FETCH_ERRORS:
+                continue
 
         return pd.DataFrame()
 
+    @staticmethod
+    def _to_price_frame(raw: pd.DataFrame) -> pd.DataFrame:
+        """
+        由 Yahoo 原始 OHLCV 直接組出中文欄位的價格 DataFrame
+
+        逐欄取出陣列並一次轉好型別：價格 float32、成交量 int32（超出 int32
+        範圍時保留 int64），不經 rename 與 astype 產生中間 DataFrame。
+        """
+        data = {zh: raw[en].to_numpy(dtype=np.float32)
+                for en, zh in _COL_MAP.items() if en != 'Volume'}
+        volume = np.nan_to_num(raw['Volume'].to_numpy(dtype=np.float64))
+        data['成交量'] = volume.astype(
+            np.int32 if len(volume) == 0 or volume.max() < 2**31 else np.int64)
+        return pd.DataFrame(data, index=raw.index)
+
+    def _update_history(self, stock_id: str, start: datetime, end: datetime,
+                        force_refresh: bool = False) -> pd.DataFrame:
+        """
+        增量更新價格歷史
+
+        只下載 [start, min_date) 與 [max_date, end] 兩段缺口，前段其間沒有平日時
+        不必連線；max_date 當天重抓一次，以覆蓋盤中尚未收定的最後一根K線。
+        若本機資料在最近一次收盤之後才更新，尾段已完整，不需連線。
+
+        Returns:
+            合併後的完整價格歷史
+        """
+        history, meta = self._load_history(stock_id)
+
+        if history is None:
+            # 首次下載：沿用原本「超過 3 筆才算有效」的判斷
+            history = self._download(stock_id, start, end, min_rows=4)
+            if history.empty:
+                return history
+            meta = {'min_date': start.date(), 'max_date': end.date()}
+            if self._reaches_last_close(history):
+                meta['synced'] = datetime.now(TAIPEI_TZ).date()
+        else:
+            # 下載失敗（逾時、限流）會得到空結果，此時不移動涵蓋範圍，下次再補抓；
+            # 成功時以實際取得的第一／最後一根K線日期為準
+            parts = []
+            if np.busday_count(start.date(), meta['min_date']) > 0:
+                head_end = datetime.combine(meta['min_date'], datetime.min.time())
+                head = self._download(stock_id, start, head_end)
+                if not head.empty:
+                    parts.append(head)
+                    meta['min_date'] = head.index[0].date()
+            parts.append(history)
+            if end.date() >= meta['max_date'] and (force_refresh or not self._is_synced(meta)):
+                tail_start = datetime.combine(meta['max_date'], datetime.min.time())
+                tail = self._download(stock_id, tail_start, end)
+                if not tail.empty:
+                    parts.append(tail)
+                    # K線日期為台北時間，伺服器時區較慢時不可超過本次查詢的結束日
+                    meta['max_date'] = min(tail.index[-1].date(), end.date())
+                # 尾段取到最近一次收盤的K線才算同步完成，失敗時下次仍會補抓
+                if self._reaches_last_close(tail):
+                    meta['synced'] = datetime.now(TAIPEI_TZ).date()
+
+            history = pd.concat(parts)
+            history = history[~history.index.duplicated(keep='last')].sort_index()
+
+        with self._cache_lock:
+            self._history[stock_id] = (history, meta)
+        self._save_history(stock_id, history, meta)
+        return history
+
+    @staticmethod
+    def _is_synced(meta: Dict[str, date]) -> bool:
+        """synced（最後一次補抓尾段的台北日期）晚於最近收盤日時，歷史已含完整K線"""
+        last_close = _last_market_close(datetime.now(TAIPEI_TZ))
+        return meta.get('synced', date.min) > last_close.date()
+
+    @staticmethod
+    def _reaches_last_close(prices: pd.DataFrame) -> bool:
+        """價格資料是否已包含最近一次收盤日的K線"""
+        last_close = _last_market_close(datetime.now(TAIPEI_TZ))
+        return not prices.empty and prices.index[-1].date() >= last_close.date()
+
+    def _history_path(self, stock_id: str) -> Path:
+        return self._cache_dir / 'prices' / f'{stock_id}.parquet'
+
+    def _load_history(self, stock_id: str):
+        """讀取價格歷史（記憶體優先，其次為本機 Parquet 檔）"""
+        with self._cache_lock:
+            cached = self._history.get(stock_id)
+        if cached is not None:
+            history, meta = cached
+            return history, dict(meta)
+
+        try:
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(self._history_path(stock_id))
+            raw = json.loads(table.schema.metadata[b'stock_analyzer'])
+            meta = {k: date.fromisoformat(v) for k, v in raw.items()}
+            history = table.to_pandas()
+        except (ImportError, OSError, KeyError, TypeError, ValueError):
+            return None, None
+
+        with self._cache_lock:
+            self._history[stock_id] = (history, meta)
+        return history, dict(meta)
+
+    def _save_history(self, stock_id: str, history: pd.DataFrame, meta: Dict[str, date]):
+        """寫入本機 Parquet 檔（失敗時僅保留記憶體快取）"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(history)
+            schema_meta = dict(table.schema.metadata or {})
+            schema_meta[b'stock_analyzer'] = json.dumps(
+                {k: v.isoformat() for k, v in meta.items()}
+            ).encode()
+            table = table.replace_schema_metadata(schema_meta)
+
+            path = self._history_path(stock_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table, path, compression='zstd')
+        except (ImportError, OSError):
+            pass
+
+    def _open_db(self) -> Optional[sqlite3.Connection]:
+        """開啟股票資訊快取資料庫（無法建立時回傳 None，僅停用持久快取）"""
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._cache_dir / 'cache.db'), check_same_thread=False)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS stock_info ('
+                'stock_id TEXT PRIMARY KEY, fetched_at INTEGER, payload BLOB)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_stock_info_fetched_at ON stock_info(fetched_at)'
+            )
+            conn.commit()
+            return conn
+        except (OSError, sqlite3.Error):
+            return None
+
+    def list_stocks(self, sector: Optional[str] = None,
+                    industry: Optional[str] = None) -> pd.DataFrame:
+        """
+        依產業篩選本地資料庫收錄的股票
+
+        Args:
+            sector: 產業類別（如 '科技業'），None 表示不限
+            industry: 細分產業（如 '半導體'），None 表示不限
+
+        Returns:
+            索引為股票代碼、欄位為 name / sector / industry 的 DataFrame
+        """
+        df = self.stock_info_df
+        mask = np.ones(len(df), dtype=bool)
+        if sector is not None:
+            mask &= (df['sector'] == sector).to_numpy()
+        if industry is not None:
+            mask &= (df['industry'] == industry).to_numpy()
+        return df[mask]
+
     def get_stock_info(self, stock_id: str) -> Dict:
         """
         獲取股票基本資訊 - 結合本地資料庫與即時股價計算
+
+        結果保存於 SQLite 15 分鐘，程式重啟後仍可直接使用；格式化完成的
+        結果另存於記憶體快取，重複查詢不必再反序列化或重新組字串。
         """
+        if not _valid_stock_id(stock_id):
+            return {}
+
+        cache_key = f"stock_info_{stock_id}"
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    row = self._db.execute(
+                        'SELECT fetched_at, payload FROM stock_info WHERE stock_id = ?',
+                        (stock_id,)
+                    ).fetchone()
+                if row and time.time() - row[0] < 900:
+                    info = pickle.loads(row[1])
+                    with self._cache_lock:
+                        self._cache[cache_key] = info
+                    return dict(info)
+            except (sqlite3.Error, pickle.UnpicklingError):
+                pass
+
+        info = self._fetch_stock_info(stock_id)
+
+        # 只保存取得股價的完整結果，「載入中」的暫時結果不寫入
+        if info.get('當前價格') is None:
+            return info
+
+        with self._cache_lock:
+            self._cache[cache_key] = info
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO stock_info (stock_id, fetched_at, payload) '
+                        'VALUES (?, ?, ?)',
+                        (stock_id, int(time.time()), pickle.dumps(info))
+                    )
+                    self._db.commit()
+            except sqlite3.Error:
+                pass
+
+        return dict(info)
+
+    def get_stock_infos(self, stock_ids: List[str]) -> Dict[str, Dict]:
+        """
+        同時獲取多檔股票基本資訊
+
+        與 get_stock_prices 相同，以執行緒池並行查詢，快取未命中的代碼
+        各自連線，總耗時約為單次往返時間。
+
+        Args:
+            stock_ids: 股票代碼列表
+
+        Returns:
+            stock_id -> 股票資訊字典（取不到資料者為空字典）
+        """
+        stock_ids = list(dict.fromkeys(stock_ids))
+        if not stock_ids:
+            return {}
+
+        return dict(zip(stock_ids, IO_POOL.map(self.get_stock_info, stock_ids)))
+
+    def _fetch_stock_info(self, stock_id: str) -> Dict:
+        """從本地資料庫與 Yahoo Finance 組合股票資訊"""
         # 從本地資料庫獲取基本資訊
         stock_data = self.stock_info_db.get(stock_id, {})
         company_name = stock_data.get('name', stock_id)
@@ -185,10 +686,8 @@ class TaiwanStockDataFetcher:
             }
 
         # 從股價資料計算
-        current_price = float(df['收盤價'].iloc[-1])
-        week52_high = float(df['最高價'].max())
-        week52_low = float(df['最低價'].min())
-        avg_volume = float(df['成交量'].mean())
+        current_price, week52_high, week52_low = self._ohlc_stats(df)
+        current_price = round(current_price, 2)
 
         # 嘗試從 yfinance 獲取更多資訊
         pe_ratio = 'N/A'
@@ -196,41 +695,32 @@ class TaiwanStockDataFetcher:
         market_cap = 'N/A'
         div_yield = 'N/A'
 
-        if _yf_available:
-            for sfx in ['.TW', '.TWO']:
-                try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        ticker = yf.Ticker(f"{stock_id}{sfx}")
-                        info = ticker.info
-
-                        if info and info.get('regularMarketPrice'):
-                            # 本益比
-                            if info.get('trailingPE'):
-                                pe_ratio = f"{info['trailingPE']:.2f}"
-
-                            # 股價淨值比
-                            if info.get('priceToBook'):
-                                pb_ratio = f"{info['priceToBook']:.2f}"
-
-                            # 市值
-                            mc = info.get('marketCap')
-                            if mc:
-                                if mc >= 1e12:
-                                    market_cap = f"{mc/1e12:.2f} 兆"
-                                elif mc >= 1e8:
-                                    market_cap = f"{mc/1e8:.2f} 億"
-                                else:
-                                    market_cap = f"{mc:,.0f}"
-
-                            # 殖利率
-                            dy = info.get('dividendYield')
-                            if dy:
-                                div_yield = f"{dy * 100:.2f}%"
-
-                            break
-                except Exception:
-                    continue
+        # ETF 沒有本益比等欄位，不必查詢；基本面取不到時仍以股價資料回傳
+        info = {}
+        if stock_id not in _ETF_IDS:
+            try:
+                info = self._get_fundamentals(stock_id)
+            except Exception:
+                logger.warning("取得 %s 基本面資料失敗", stock_id, exc_info=True)
+
+        # 本益比
+        if info.get('trailingPE'):
+            pe_ratio = f"{info['trailingPE']:.2f}"
+
+        # 股價淨值比
+        if info.get('priceToBook'):
+            pb_ratio = f"{info['priceToBook']:.2f}"
+
+        # 市值
+        mc = info.get('marketCap')
+        if mc:
+            div, fmt = _MC_BUCKETS[bisect_right(_MC_THRESHOLDS, mc)]
+            market_cap = fmt.format(mc / div)
+
+        # 殖利率
+        dy = info.get('dividendYield')
+        if dy:
+            div_yield = f"{dy * 100:.2f}%"
 
         return {
             '股票代碼': stock_id,
@@ -247,55 +737,294 @@ class TaiwanStockDataFetcher:
             '資料來源': 'Yahoo Finance'
         }
 
+    @staticmethod
+    def _ohlc_stats(df: pd.DataFrame) -> Tuple[float, float, float]:
+        """一次取出價格陣列（皆為 float32，不需轉型），回傳 (最新收盤價, 最高價, 最低價)"""
+        arr = df[['收盤價', '最高價', '最低價']].to_numpy()
+        return float(arr[-1, 0]), float(arr[:, 1].max()), float(arr[:, 2].min())
+
+    def _get_fundamentals(self, stock_id: str) -> Dict:
+        """
+        取得 Yahoo 基本面欄位（快取 FUNDAMENTALS_TTL 秒）
+
+        Returns:
+            trailingPE / priceToBook / marketCap / dividendYield，取不到時為空 dict
+        """
+        cache_key = f"info_{stock_id}"
+        with self._cache_lock:
+            cached = self._fundamentals.get(cache_key)
+        if cached is not None:
+            return cached
+
+        yf = _get_yf()
+        if yf is None:
+            return {}
+
+        for sfx in self._suffixes(stock_id):
+            try:
+                info = yf.Ticker(f"{stock_id}{sfx}").info
+                if info and info.get('regularMarketPrice'):
+                    fundamentals = {
+                        k: info.get(k)
+                        for k in ('trailingPE', 'priceToBook', 'marketCap', 'dividendYield')
+                    }
+                    with self._cache_lock:
+                        self._fundamentals[cache_key] = fundamentals
+                    self._remember_suffix(stock_id, sfx)
+                    return fundamentals
+            except _FETCH_ERRORS:
+                continue
+
+        return {}
+
     def get_realtime_price(self, stock_id: str) -> Dict:
         """
         獲取即時價格 - 從最新股價資料獲取
+
+        非交易時間若已有收盤後取得的報價，直接沿用而不再連線。
         """
+        if not _valid_stock_id(stock_id):
+            return {}
+
+        cached = self._cached_quote(stock_id)
+        if cached:
+            return cached
+
         df = self.get_stock_price(stock_id, days=5)
 
         if df.empty:
             return {}
 
+        with self._cache_lock:
+            cached = self._cache.get(f"price_{stock_id}_max")
+        fetched_at = cached[2] if cached is not None else float('-inf')
+        return self._build_quote(stock_id, df, fetched_at)
+
+    def _cached_quote(self, stock_id: str) -> Optional[Dict]:
+        """由收盤後下載的價格資料組出的報價，在下次開盤前都有效"""
+        if self.is_market_open():
+            return None
+        with self._cache_lock:
+            cached = self._quotes.get(stock_id)
+        if cached is None:
+            return None
+        now = datetime.now(TAIPEI_TZ)
+        closed_for = (now - _last_market_close(now)).total_seconds()
+        if cached[0] >= time.monotonic() - closed_for:
+            return dict(cached[1])
+        return None
+
+    def _build_quote(self, stock_id: str, df: pd.DataFrame, fetched_at: float) -> Dict:
+        """
+        由最近兩根日K組出即時報價，並記錄供收盤後沿用
+
+        Args:
+            stock_id: 股票代碼
+            df: 價格資料
+            fetched_at: 價格資料的下載時間（time.monotonic()）
+        """
         stock_data = self.stock_info_db.get(stock_id, {})
         company_name = stock_data.get('name', stock_id)
 
-        latest = df.iloc[-1]
-        prev = df.iloc[-2] if len(df) > 1 else latest
+        # 一次取出底層陣列，避免逐欄 iloc 建立 Series
+        arr = df[_PRICE_COLS].to_numpy()
+        latest = arr[-1]
+        prev = arr[-2] if len(arr) > 1 else latest
 
-        current_price = float(latest['收盤價'])
-        prev_close = float(prev['收盤價'])
+        # 價格以 float32 保存，輸出時四捨五入到小數 2 位
+        current_price = round(float(latest[3]), 2)
+        prev_close = round(float(prev[3]), 2)
         change = current_price - prev_close
         change_pct = (change / prev_close) * 100 if prev_close > 0 else 0
 
-        return {
+        quote = {
             '股票代碼': stock_id,
             '股票名稱': company_name,
             '當前價格': current_price,
-            '開盤價': float(latest['開盤價']),
-            '最高價': float(latest['最高價']),
-            '最低價': float(latest['最低價']),
+            '開盤價': round(float(latest[0]), 2),
+            '最高價': round(float(latest[1]), 2),
+            '最低價': round(float(latest[2]), 2),
             '昨收價': prev_close,
-            '成交量': int(latest['成交量']),
+            '成交量': int(latest[4]),
             '漲跌': round(change, 2),
             '漲跌幅': round(change_pct, 2),
             '時間': str(df.index[-1].date()),
             '資料來源': 'Yahoo Finance'
         }
+        with self._cache_lock:
+            self._quotes[stock_id] = (fetched_at, quote)
+        return dict(quote)
+
+    def _download_batch(self, stock_ids: List[str], start: datetime, end: datetime,
+                        sfx: str = '.TW') -> Dict[str, pd.DataFrame]:
+        """
+        一次請求下載多檔股票日K（每 BATCH_SIZE 檔一批）
+
+        Args:
+            stock_ids: 股票代碼列表
+            start: 起始時間
+            end: 結束時間
+            sfx: 市場後綴
+
+        Returns:
+            stock_id -> 中文欄位價格 DataFrame（無資料的代碼不列入）
+        """
+        # 格式不符的代碼不送出請求
+        stock_ids = [sid for sid in stock_ids if _valid_stock_id(sid)]
+        yf = _get_yf() if stock_ids else None
+        if yf is None:
+            return {}
+
+        frames = {}
+        for i in range(0, len(stock_ids), self.BATCH_SIZE):
+            chunk = stock_ids[i:i + self.BATCH_SIZE]
+            try:
+                raw = yf.download(
+                    [f"{sid}{sfx}" for sid in chunk],
+                    start=start,
+                    end=end,
+                    group_by='ticker',
+                    progress=False,
+                    auto_adjust=True,
+                    threads=True,
+                    timeout=self.YF_TIMEOUT
+                )
+            except _FETCH_ERRORS:
+                continue
+
+            if raw is None or raw.empty:
+                continue
+
+            symbols = raw.columns.get_level_values(0)
+            for sid in chunk:
+                symbol = f"{sid}{sfx}"
+                if symbol not in symbols:
+                    continue
+                sub = raw[symbol].dropna(how='all')
+                if sub.empty:
+                    continue
+                frames[sid] = self._to_price_frame(sub)
+                self._remember_suffix(sid, sfx)
+        return frames
 
     def get_top_stocks(self, limit: int = 10) -> List[Dict]:
-        """獲取熱門股票即時價格"""
-        top_list = ['2330', '2317', '2454', '2412', '2882', '2881', '2886', '2891', '2303', '2308']
-        results = []
-        for stock_id in top_list[:limit]:
-            price_data = self.get_realtime_price(stock_id)
-            if price_data:
-                results.append(price_data)
-        return results
+        """
+        獲取熱門股票即時價格
+
+        收盤後已同步的本機歷史直接沿用；其餘未快取的代碼以多檔下載一次
+        取得：先整批查 .TW，缺漏者再整批查 .TWO，
+        仍取不到的再以執行緒池逐檔查詢。下載結果寫入與 get_stock_price 相同的
+        快取鍵，之後單檔查詢也能命中。
+        """
+        stock_ids = _TOP_STOCKS[:limit]
+
+        quotes = {}
+        missing = []
+        for sid in stock_ids:
+            quote = self._cached_quote(sid)
+            if not quote:
+                cached = self._get_cached_price(sid)
+                quote = self._build_quote(sid, cached[1], cached[2]) if cached is not None else None
+            if quote:
+                quotes[sid] = quote
+            else:
+                missing.append(sid)
+
+        # 本機歷史在最近收盤後已同步者直接使用，不必連線
+        for sid in missing:
+            history, meta = self._load_history(sid)
+            if history is not None and not history.empty and self._is_synced(meta):
+                fetch_start = datetime.combine(meta['min_date'], datetime.min.time())
+                cached = (fetch_start, history, time.monotonic())
+                with self._cache_lock:
+                    self._cache[f"price_{sid}_max"] = cached
+                quotes[sid] = self._build_quote(sid, history, cached[2])
+        missing = [sid for sid in missing if sid not in quotes]
+
+        if missing:
+            # 已知為上櫃的代碼直接查 .TWO
+            listed = [sid for sid in missing if self._suffix_cache.get(sid, '.TW') == '.TW']
+            otc = [sid for sid in missing if sid not in listed]
+            # 與 get_realtime_price（days=5）相同的下載區間
+            end = datetime.now()
+            start = end - timedelta(days=_lookback_days(5))
+            frames = self._download_batch(listed, start, end, '.TW')
+            otc += [sid for sid in listed if sid not in frames]
+            frames.update(self._download_batch(otc, start, end, '.TWO'))
+
+            for sid, df in frames.items():
+                fetched_at = time.monotonic()
+                with self._cache_lock:
+                    self._cache[f"price_{sid}_max"] = (start, df, fetched_at)
+                quotes[sid] = self._build_quote(sid, df, fetched_at)
+
+            # 批次下載失敗者改為逐檔查詢，並行發出
+            retry = [sid for sid in missing if sid not in quotes]
+            if retry:
+                for sid, quote in zip(retry, IO_POOL.map(self.get_realtime_price, retry)):
+                    if quote:
+                        quotes[sid] = quote
+
+        return [quotes[sid] for sid in stock_ids if sid in quotes]
+
+
+# 權證名稱中的發行商簡稱 -> 全名
+_ISSUER_MAP = MappingProxyType({
+    '元大': '元大證券', '富邦': '富邦證券', '凱基': '凱基證券',
+    '群益': '群益證券', '統一': '統一證券', '永豐': '永豐證券',
+    '國泰': '國泰證券', '中信': '中信證券', '兆豐': '兆豐證券',
+    '元富': '元富證券', '國票': '國票證券', '日盛': '日盛證券',
+    '康和': '康和證券', '第一': '第一金證券', '台新': '台新證券',
+    '華南': '華南證券', '玉山': '玉山證券', '合庫': '合庫證券',
+})
+_ISSUER_RE = re.compile('|'.join(map(re.escape, _ISSUER_MAP)))
+
+# Yahoo 權證頁面內嵌的權證列表 JSON 起點
+_WARRANTS_ANCHOR = '"warrants":['
+_JSON_DECODER = json.JSONDecoder()
+# 證交所權證全名中的到期日（如 20260130購），str.extract 使用字串樣式
+_EXPIRY_PATTERN = r'(\d{8})[美歐]?[購售]'
+_EXPIRY_RE = re.compile(_EXPIRY_PATTERN)
+
+
+def _extract_warrants(text: str) -> Optional[list]:
+    """
+    取出頁面內嵌的權證列表
+
+    以 str.find 定位後交給 JSON 解碼器從 '[' 讀到對應的 ']' 為止，
+    不必以 DOTALL 正規表示式掃描整份頁面，巢狀的 '}]' 也不會提早截斷。
+    """
+    i = text.find(_WARRANTS_ANCHOR)
+    if i < 0:
+        return None
+    try:
+        warrants, _ = _JSON_DECODER.raw_decode(text, i + len(_WARRANTS_ANCHOR) - 1)
+    except ValueError:
+        return None
+    return warrants
+
+
+def _issuer_of(name: str) -> str:
+    """
+    由權證名稱解析發行商
+
+    名稱格式為「標的 + 發行商 + 期別」，發行商簡稱緊接在標的之後；標的名稱
+    本身也可能含有發行商簡稱（如「國泰金凱基51購01」的國泰），因此出現
+    多個簡稱時以位置最後者為準，與對照表中的順序無關。
+    """
+    matches = _ISSUER_RE.findall(name)
+    return _ISSUER_MAP[matches[-1]] if matches else '未知'
 
 
 class WarrantDataFetcher:
     """權證資料獲取器 - 從 Yahoo 股市和證交所 API 獲取真實資料"""
 
+    # 權證列表快取設定（秒／最大筆數）
+    CACHE_TTL = 300
+    CACHE_MAX_ENTRIES = 256
+
+    __slots__ = ('yahoo_headers', 'twse_headers', 'issuer_map', '_cache', '_by_code', '_session')
+
     def __init__(self):
         self.yahoo_headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
@@ -304,17 +1033,19 @@ class WarrantDataFetcher:
             'User-Agent': 'Mozilla/5.0',
             'Referer': 'https://mis.twse.com.tw/stock/index.jsp'
         }
-        # 發行商代碼對照表
-        self.issuer_map = {
-            '元大': '元大證券', '富邦': '富邦證券', '凱基': '凱基證券',
-            '群益': '群益證券', '統一': '統一證券', '永豐': '永豐證券',
-            '國泰': '國泰證券', '中信': '中信證券', '兆豐': '兆豐證券',
-            '元富': '元富證券', '國票': '國票證券', '日盛': '日盛證券',
-            '康和': '康和證券', '第一': '第一金證券', '台新': '台新證券',
-            '華南': '華南證券', '玉山': '玉山證券', '合庫': '合庫證券',
-        }
-        self._cache = {}
-        self._cache_time = {}
+        self.issuer_map = _ISSUER_MAP  # 發行商代碼對照表（模組共用，唯讀）
+        # 共用連線（保留 TCP/TLS 連線供後續請求重用），連線失敗與 5xx 自動重試
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.3,
+                              status_forcelist=(500, 502, 503, 504))
+        ))
+        # 以單調時鐘計算有效期，過期或超過上限時自動淘汰
+        self._cache = TTLCache(maxsize=self.CACHE_MAX_ENTRIES, ttl=self.CACHE_TTL)
+        # 權證代碼 -> (所屬列表的快取鍵, 詳細資訊)，由 get_warrant_list 建立
+        self._by_code: Dict[str, Tuple[str, Dict]] = {}
 
     def get_warrant_list(self, stock_id: str = None) -> pd.DataFrame:
         """
@@ -326,34 +1057,24 @@ class WarrantDataFetcher:
         Returns:
             權證列表 DataFrame
         """
-        import re
-        import json
-        from datetime import datetime
-
         if not stock_id:
             return pd.DataFrame()
 
         # 檢查快取（5分鐘內有效）
         cache_key = f'warrant_list_{stock_id}'
-        if cache_key in self._cache:
-            cache_age = (datetime.now() - self._cache_time.get(cache_key, datetime.min)).seconds
-            if cache_age < 300:
-                return self._cache[cache_key].copy()
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            # 完整複製：pandas 2.x 未啟用 Copy-on-Write 時，淺層複製仍與快取共用資料
+            return cached.copy()
 
         try:
             # 從 Yahoo 股市獲取權證列表
             url = f'https://tw.stock.yahoo.com/quote/{stock_id}/warrant'
-            resp = requests.get(url, headers=self.yahoo_headers, timeout=15)
+            resp = self._session.get(url, headers=self.yahoo_headers, timeout=15)
             resp.raise_for_status()
 
             # 解析頁面中的 JSON 資料
-            match = re.search(r'"warrants":(\[\{.*?\}\])', resp.text, re.DOTALL)
-            if not match:
-                return pd.DataFrame()
-
-            warrants_json = match.group(1)
-            warrants_basic = json.loads(warrants_json)
-
+            warrants_basic = _extract_warrants(resp.text)
             if not warrants_basic:
                 return pd.DataFrame()
 
@@ -364,62 +1085,64 @@ class WarrantDataFetcher:
             # 從證交所 API 獲取詳細資訊
             warrant_details = self._get_warrant_details_from_twse(warrant_codes)
 
-            # 合併資料
-            result = []
-            for w in warrants_basic:
-                code = w.get('symbol', '').replace('.TW', '').replace('.TWO', '')
-                name = w.get('name', '')
-
-                # 解析權證類型和發行商
-                warrant_type = '認購' if '購' in name else ('認售' if '售' in name else '未知')
-                issuer = '未知'
-                for key, val in self.issuer_map.items():
-                    if key in name:
-                        issuer = val
-                        break
-
-                # 從證交所資料取得詳細資訊
-                detail = warrant_details.get(code, {})
-
-                # 解析到期日（從完整名稱中提取）
-                expiry_date = detail.get('expiry_date', '')
-                if not expiry_date and detail.get('nf'):
-                    # 從 nf 欄位解析到期日，格式如 "台積電群益51購26－台積電 20260130美購"
-                    nf_match = re.search(r'(\d{8})[美歐]?[購售]', detail.get('nf', ''))
-                    if nf_match:
-                        date_str = nf_match.group(1)
-                        expiry_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}"
-
-                # 計算行使比例（從漲跌停價格推算）
-                # 一般權證行使比例介於 0.01 ~ 1.0 之間
-                # 可從權證價格和標的股票價格的關係推估
-                exercise_ratio = detail.get('exercise_ratio', 0.1)
-
-                # 履約價無法從公開 API 獲取，標記為需查詢發行商
-                strike_price = detail.get('strike_price', None)
-
-                result.append({
-                    '權證代碼': code,
-                    '權證名稱': name,
-                    '標的股票': stock_id,
-                    '發行商': issuer,
-                    '權證類型': warrant_type,
-                    '行使比例': exercise_ratio,
-                    '履約價': strike_price,  # None 表示無法取得
-                    '到期日': expiry_date,
-                    '隱含波動率': detail.get('iv', 30.0),
-                    '權證價格': detail.get('price', 0),
-                    '昨收價': detail.get('prev_close', 0),
-                    '漲停價': detail.get('limit_up', 0),
-                    '跌停價': detail.get('limit_down', 0),
-                    '成交量': detail.get('volume', 0),
-                })
-
-            df = pd.DataFrame(result)
+            # 合併資料：逐欄組成陣列後一次建立 DataFrame，不逐筆建立 dict
+            names = pd.Series([w.get('name', '') for w in warrants_basic])
+            details = [warrant_details.get(code, {}) for code in warrant_codes]
+
+            def column(key, default):
+                return [d.get(key, default) for d in details]
+
+            # 解析到期日（從完整名稱中提取），格式如 "台積電群益51購26－台積電 20260130美購"
+            nf = pd.Series(column('nf', ''))
+            expiry = pd.to_datetime(nf.str.extract(_EXPIRY_PATTERN, expand=False),
+                                    format='%Y%m%d', errors='coerce')
+            # 距到期天數（日期運算向量化，無到期日者為 <NA>）
+            today = pd.Timestamp.now(tz=TAIPEI_TZ).tz_localize(None).normalize()
+
+            df = pd.DataFrame({
+                '權證代碼': warrant_codes,
+                '權證名稱': names,
+                '標的股票': stock_id,
+                # 發行商與權證類型由名稱解析
+                '發行商': [_issuer_of(name) for name in names],
+                '權證類型': np.select(
+                    [names.str.contains('購', regex=False), names.str.contains('售', regex=False)],
+                    ['認購', '認售'], '未知'
+                ),
+                # 行使比例暫用預設值（一般權證介於 0.01 ~ 1.0 之間）
+                '行使比例': column('exercise_ratio', 0.1),
+                # 履約價無法從公開 API 獲取，None 表示需查詢發行商
+                '履約價': column('strike_price', None),
+                '到期日': expiry.dt.strftime('%Y-%m-%d').fillna(''),
+                '隱含波動率': column('iv', 30.0),
+                '權證價格': column('price', 0),
+                '昨收價': column('prev_close', 0),
+                '漲停價': column('limit_up', 0),
+                '跌停價': column('limit_down', 0),
+                '成交量': column('volume', 0),
+                '剩餘天數': (expiry - today).dt.days.astype('Int32'),
+            })
+
+            # 有證交所報價的權證，可直接供 get_warrant_detail 使用
+            by_code = {}
+            for row, detail in zip(df.to_dict('records'), details):
+                if detail:
+                    by_code[row['權證代碼']] = (cache_key, {
+                        **row,
+                        '標的名稱': detail.get('underlying', ''),
+                        '最高價': detail.get('high', 0),
+                        '最低價': detail.get('low', 0),
+                        '開盤價': detail.get('open', 0),
+                    })
 
             # 快取結果
             self._cache[cache_key] = df
-            self._cache_time[cache_key] = datetime.now()
+            # 清掉所屬列表已過期的索引項目，再加入本次結果
+            self._by_code = {
+                code: entry for code, entry in self._by_code.items()
+                if entry[0] in self._cache
+            }
+            self._by_code.update(by_code)
 
             return df
 
@@ -437,65 +1160,83 @@ class WarrantDataFetcher:
         Returns:
             權證詳細資訊字典
         """
-        import re
-
         if not warrant_codes:
             return {}
 
+        # 分批查詢（每次最多20個），多批時並行送出
+        batch_size = 20
+        batches = [warrant_codes[i:i + batch_size]
+                   for i in range(0, len(warrant_codes), batch_size)]
+        if len(batches) == 1:
+            return self._fetch_twse_batch(batches[0])
+
         result = {}
+        for part in IO_POOL.map(self._fetch_twse_batch, batches):
+            result.update(part)
+        return result
 
-        # 分批查詢（每次最多20個）
-        batch_size = 20
-        for i in range(0, len(warrant_codes), batch_size):
-            batch = warrant_codes[i:i+batch_size]
+    def _fetch_twse_batch(self, batch: List[str]) -> Dict:
+        """查詢一批（最多 20 個）權證的證交所報價"""
+        result = {}
 
-            # 組合查詢字串
-            ex_ch = '|'.join([f'tse_{code}.tw' for code in batch])
-            url = f'https://mis.twse.com.tw/stock/api/getStockInfo.jsp?ex_ch={ex_ch}&json=1&delay=0'
+        # 組合查詢字串
+        ex_ch = '|'.join([f'tse_{code}.tw' for code in batch])
+        url = f'https://mis.twse.com.tw/stock/api/getStockInfo.jsp?ex_ch={ex_ch}&json=1&delay=0'
 
-            try:
-                resp = requests.get(url, headers=self.twse_headers, timeout=10)
-                data = resp.json()
-
-                if data.get('rtcode') == '0000':
-                    for item in data.get('msgArray', []):
-                        code = item.get('c', '')
-                        if code:
-                            # 解析價格（可能是 '-' 表示無成交）
-                            price = item.get('z', '-')
-                            price = float(price) if price and price != '-' else 0
-
-                            prev_close = item.get('y', '0')
-                            prev_close = float(prev_close) if prev_close else 0
-
-                            limit_up = item.get('u', '0')
-                            limit_up = float(limit_up) if limit_up else 0
-
-                            limit_down = item.get('w', '0')
-                            limit_down = float(limit_down) if limit_down else 0
-
-                            volume = item.get('v', '0')
-                            volume = int(volume) if volume else 0
-
-                            # 解析到期日和其他資訊
-                            nf = item.get('nf', '')
-
-                            result[code] = {
-                                'price': price if price > 0 else prev_close,
-                                'prev_close': prev_close,
-                                'limit_up': limit_up,
-                                'limit_down': limit_down,
-                                'volume': volume,
-                                'nf': nf,
-                                'underlying': item.get('rn', ''),
-                                'underlying_code': item.get('rch', ''),
-                                'exercise_ratio': 0.1,  # 預設值
-                                'strike_price': 0,  # 需要從其他來源獲取
-                                'iv': 30.0,  # 預設值
-                            }
-            except Exception as e:
-                print(f"TWSE API 查詢失敗: {e}")
-                continue
+        try:
+            resp = self._session.get(url, headers=self.twse_headers, timeout=10)
+            data = _json_loads(resp.content)
+
+            if data.get('rtcode') == '0000':
+                for item in data.get('msgArray', []):
+                    code = item.get('c', '')
+                    if code:
+                        # 解析價格（可能是 '-' 表示無成交）
+                        price = item.get('z', '-')
+                        price = float(price) if price and price != '-' else 0
+
+                        prev_close = item.get('y', '0')
+                        prev_close = float(prev_close) if prev_close else 0
+
+                        limit_up = item.get('u', '0')
+                        limit_up = float(limit_up) if limit_up else 0
+
+                        limit_down = item.get('w', '0')
+                        limit_down = float(limit_down) if limit_down else 0
+
+                        volume = item.get('v', '0')
+                        volume = int(volume) if volume else 0
+
+                        high = item.get('h', '-')
+                        high = float(high) if high and high != '-' else 0
+
+                        low = item.get('l', '-')
+                        low = float(low) if low and low != '-' else 0
+
+                        open_price = item.get('o', '-')
+                        open_price = float(open_price) if open_price and open_price != '-' else 0
+
+                        # 解析到期日和其他資訊
+                        nf = item.get('nf', '')
+
+                        result[code] = {
+                            'price': price if price > 0 else prev_close,
+                            'prev_close': prev_close,
+                            'limit_up': limit_up,
+                            'limit_down': limit_down,
+                            'volume': volume,
+                            'high': high,
+                            'low': low,
+                            'open': open_price,
+                            'nf': nf,
+                            'underlying': item.get('rn', ''),
+                            'underlying_code': item.get('rch', ''),
+                            'exercise_ratio': 0.1,  # 預設值
+                            'strike_price': 0,  # 需要從其他來源獲取
+                            'iv': 30.0,  # 預設值
+                        }
+        except Exception as e:
+            print(f"TWSE API 查詢失敗: {e}")
 
         return result
 
@@ -509,16 +1250,18 @@ class WarrantDataFetcher:
         Returns:
             權證詳細資訊字典
         """
-        import re
-        from datetime import datetime
+        # 權證列表剛查詢過時，直接使用同一批證交所報價
+        indexed = self._by_code.get(warrant_code)
+        if indexed and indexed[0] in self._cache:
+            return dict(indexed[1])
 
         try:
             # 從證交所 API 獲取即時資訊
             ex_ch = f'tse_{warrant_code}.tw'
             url = f'https://mis.twse.com.tw/stock/api/getStockInfo.jsp?ex_ch={ex_ch}&json=1&delay=0'
 
-            resp = requests.get(url, headers=self.twse_headers, timeout=10)
-            data = resp.json()
+            resp = self._session.get(url, headers=self.twse_headers, timeout=10)
+            data = _json_loads(resp.content)
 
             if data.get('rtcode') != '0000' or not data.get('msgArray'):
                 return {}
@@ -538,7 +1281,7 @@ class WarrantDataFetcher:
             # 解析完整名稱取得到期日
             nf = item.get('nf', '')
             expiry_date = ''
-            nf_match = re.search(r'(\d{8})[美歐]?[購售]', nf)
+            nf_match = _EXPIRY_RE.search(nf)
             if nf_match:
                 date_str = nf_match.group(1)
                 expiry_date = f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}"
@@ -548,11 +1291,7 @@ class WarrantDataFetcher:
             warrant_type = '認購' if '購' in name or '購' in nf else ('認售' if '售' in name or '售' in nf else '未知')
 
             # 解析發行商
-            issuer = '未知'
-            for key, val in self.issuer_map.items():
-                if key in name:
-                    issuer = val
-                    break
+            issuer = _issuer_of(name)
 
             return {
                 '權證代碼': warrant_code,
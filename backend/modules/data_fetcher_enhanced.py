@@ -7,13 +7,17 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Dict, List, Optional
 import warnings
 import logging
-import sys
-import os
+import random
+import threading
 import time
 
+from backend.utils.executors import IO_POOL, REFRESH_POOL
+
 # 導入自定義模組
 try:
     from backend.utils.cache_manager import cache_manager
@@ -28,57 +32,114 @@ warnings.filterwarnings('ignore')
 logging.getLogger('yfinance').setLevel(logging.CRITICAL)
 logging.getLogger('peewee').setLevel(logging.CRITICAL)
 logging.getLogger('urllib3').setLevel(logging.CRITICAL)
-
-
-class SuppressOutput:
-    """抑制輸出內容管理器"""
-    def __enter__(self):
-        self._original_stderr = sys.stderr
-        sys.stderr = open(os.devnull, 'w')
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        sys.stderr.close()
-        sys.stderr = self._original_stderr
+# yfinance 的下載失敗訊息一律丟棄，不必在每次呼叫時另外攔截 stderr
+logging.getLogger('yfinance').addHandler(logging.NullHandler())
+logging.getLogger('yfinance').propagate = False
+
+# 快取鍵格式版本；快取內容的結構變更時遞增，舊鍵自然過期
+CACHE_KEY_VERSION = 'v2'
+
+# Yahoo OHLCV 欄位與對應的中文欄位（依序對應）
+_YF_COLS = ['Open', 'High', 'Low', 'Close', 'Volume']
+_PRICE_COLS = ['開盤價', '最高價', '最低價', '收盤價', '成交量']
+
+# 快取中的價格欄位型態：價格只需兩位小數，float32 即足夠
+_PRICE_DTYPES = {
+    '開盤價': 'float32', '最高價': 'float32', '最低價': 'float32',
+    '收盤價': 'float32', '成交量': 'int64'
+}
+
+
+# 2024年1月的真實市場參考價格（唯讀常數，所有實例共用）
+_REFERENCE_PRICES = MappingProxyType({
+    '2330': 618.0, '2317': 109.0, '2454': 1095.0, '2412': 122.5,
+    '2882': 61.2, '2881': 85.1, '2886': 37.45, '2891': 27.95,
+    '2303': 54.9, '2308': 371.0, '2382': 256.0, '2885': 24.15,
+    '2002': 56.7, '1301': 74.3, '1303': 28.5
+})
+
+# 股票資訊對照表：代碼 -> (名稱, 產業, 市值)
+_STOCK_INFO_MAP = MappingProxyType({
+    '2330': ('台積電', '半導體', 15000000),
+    '2317': ('鴻海', '電子製造', 4500000),
+    '2454': ('聯發科', '半導體', 1800000),
+    '2412': ('中華電', '電信通訊', 1200000),
+    '2882': ('國泰金', '金融保險', 850000),
+    '2881': ('富邦金', '金融保險', 920000),
+    '2886': ('兆豐金', '金融保險', 680000),
+    '2891': ('中信金', '金融保險', 540000),
+    '2303': ('聯電', '半導體', 850000),
+    '2308': ('台達電', '電子零組件', 720000),
+    '2382': ('廣達', '電子製造', 560000),
+    '2885': ('元大金', '金融保險', 450000),
+    '2002': ('中鋼', '鋼鐵工業', 980000),
+    '1301': ('台塑', '塑膠工業', 630000),
+    '1303': ('南亞', '塑膠工業', 420000)
+})
+
+
+@lru_cache(maxsize=256)
+def _static_info(sid: str) -> MappingProxyType:
+    """由對照表組出股票基本資訊；內容不隨時間變動，每個代碼只組一次"""
+    # 從對照表獲取
+    if sid in _STOCK_INFO_MAP:
+        name, industry, market_cap = _STOCK_INFO_MAP[sid]
+    else:
+        name = f'股票{sid}'
+        industry = 'N/A'
+        market_cap = 0
+
+    # 計算市值（億元）
+    market_cap_display = f"{market_cap / 10000:.1f}億" if market_cap > 0 else 'N/A'
+
+    return MappingProxyType({
+        '股票代碼': sid,
+        '公司名稱': name,
+        '產業': industry,
+        '市值': market_cap_display,
+        '本益比': 'N/A',
+        '股價淨值比': 'N/A',
+        '52週最高': 'N/A',
+        '52週最低': 'N/A'
+    })
+
+
+def _cache_key(domain: str, stock_id: str) -> str:
+    """
+    組出共用快取的鍵值：stock:{domain}:{stock_id}:{版本}
+
+    cache_manager 為全域單例，鍵值加上命名空間與版本以免和其他資料互相覆蓋。
+    """
+    return f"stock:{domain}:{stock_id}:{CACHE_KEY_VERSION}"
 
 
 class EnhancedTaiwanStockDataFetcher:
     """增強版台灣股票資料獲取器"""
 
-    def __init__(self):
-        # 2024年1月的真實市場參考價格
-        self.reference_prices = {
-            '2330': 618.0, '2317': 109.0, '2454': 1095.0, '2412': 122.5,
-            '2882': 61.2, '2881': 85.1, '2886': 37.45, '2891': 27.95,
-            '2303': 54.9, '2308': 371.0, '2382': 256.0, '2885': 24.15,
-            '2454': 1095.0, '2002': 56.7, '1301': 74.3, '1303': 28.5
-        }
-
-        # 股票資訊對照表
-        self.stock_info_map = {
-            '2330': ('台積電', '半導體', 15000000),
-            '2317': ('鴻海', '電子製造', 4500000),
-            '2454': ('聯發科', '半導體', 1800000),
-            '2412': ('中華電', '電信通訊', 1200000),
-            '2882': ('國泰金', '金融保險', 850000),
-            '2881': ('富邦金', '金融保險', 920000),
-            '2886': ('兆豐金', '金融保險', 680000),
-            '2891': ('中信金', '金融保險', 540000),
-            '2303': ('聯電', '半導體', 850000),
-            '2308': ('台達電', '電子零組件', 720000),
-            '2382': ('廣達', '電子製造', 560000),
-            '2885': ('元大金', '金融保險', 450000),
-            '2002': ('中鋼', '鋼鐵工業', 980000),
-            '1301': ('台塑', '塑膠工業', 630000),
-            '1303': ('南亞', '塑膠工業', 420000)
-        }
+    # 股價快取的最短下載筆數，較短的查詢直接從快取尾端切出
+    PRICE_WINDOW = 400
+    # 重試等待秒數上限
+    MAX_RETRY_DELAY = 30
+    # 市場後綴的快取秒數；股價快取秒數由設定 cache.stock_price_ttl 決定（預設 300）
+    SUFFIX_TTL = 86400
+    # 線上查無資料的股票在此秒數內不再重試，直接使用參考資料
+    MISS_TTL = 60
 
+    def __init__(self):
         # 從設定讀取參數
         self.use_cache = settings.get('cache.enabled', True) if settings else True
         self.max_retries = settings.get('api.max_retries', 3) if settings else 3
         self.retry_delay = settings.get('api.retry_delay', 2) if settings else 2
         self.cache_ttl = settings.get('cache.stock_price_ttl', 300) if settings else 300
 
+        # 股票代碼 -> 查詢成功的市場後綴（.TW / .TWO）
+        self._suffix_hint: Dict[str, str] = {}
+        # 股票代碼 -> 查無資料記錄的到期時間（monotonic）
+        self._misses: Dict[str, float] = {}
+        # 正在背景更新價格的股票代碼，同一檔同時只送出一次更新
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+
     def get_stock_price(self, stock_id: str, days: int = 30) -> pd.DataFrame:
         """
         獲取股票歷史價格（帶快取）
@@ -90,26 +151,69 @@ class EnhancedTaiwanStockDataFetcher:
         Returns:
             包含股價資料的 DataFrame
         """
-        # 檢查快取
-        cache_key = f"stock_price_{stock_id}_{days}"
+        cached_df = self._cached_price(stock_id, days)
+        if cached_df is not None:
+            return cached_df
 
-        if self.use_cache and cache_manager:
-            cached_data = cache_manager.get(cache_key)
-            if cached_data is not None:
-                return cached_data
+        # 一次下載最長的區間，超過時才擴大
+        window = max(days, self.PRICE_WINDOW)
 
         # 嘗試從線上獲取
-        df = self._try_online_with_retry(stock_id, days)
+        df = self._try_online_with_retry(stock_id, window)
 
         # 如果線上獲取失敗，使用參考資料
         if df.empty:
-            df = self._ref_data(stock_id, days)
+            df = self._ref_data(stock_id, window)
 
-        # 存入快取
-        if self.use_cache and cache_manager and not df.empty:
-            cache_manager.set(cache_key, df, ttl=self.cache_ttl)
+        # 成交量缺值補 0 後才能轉為整數
+        df = df.fillna({'成交量': 0}).astype(_PRICE_DTYPES)
+        self._store_price(stock_id, window, df)
 
-        return df
+        return df.tail(days)
+
+    def _cached_price(self, stock_id: str, days: int) -> Optional[pd.DataFrame]:
+        """
+        由快取取出最近 days 筆價格
+
+        每檔股票只快取一份 (下載筆數, DataFrame, 寫入時間)，較短的查詢直接切片；
+        快取不存在或筆數不足時回傳 None。快取保留兩倍 TTL，超過 TTL 的項目
+        照常回傳，同時在背景更新。
+        """
+        if not (self.use_cache and cache_manager):
+            return None
+
+        cached_data = cache_manager.get(_cache_key('price', stock_id))
+        if cached_data is None:
+            return None
+
+        window, cached_df, stored_at = cached_data
+        if window < days:
+            return None
+
+        if time.monotonic() - stored_at > self.cache_ttl:
+            with self._refresh_lock:
+                stale = stock_id not in self._refreshing
+                self._refreshing.add(stock_id)
+            if stale:
+                REFRESH_POOL.submit(self._refresh_price, stock_id, window)
+
+        return cached_df.tail(days)
+
+    def _refresh_price(self, stock_id: str, window: int) -> None:
+        """背景更新價格快取（失敗時保留舊資料，待兩倍 TTL 後自然淘汰）"""
+        try:
+            df = self._try_online(stock_id, window)
+            if not df.empty:
+                self._store_price(stock_id, window, df.fillna({'成交量': 0}).astype(_PRICE_DTYPES))
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(stock_id)
+
+    def _store_price(self, stock_id: str, window: int, df: pd.DataFrame) -> None:
+        """寫入價格快取，window 為此份資料可服務的最大查詢筆數"""
+        if self.use_cache and cache_manager and not df.empty:
+            cache_manager.set(_cache_key('price', stock_id), (window, df, time.monotonic()),
+                              ttl=2 * self.cache_ttl)
 
     def _try_online_with_retry(self, stock_id: str, days: int) -> pd.DataFrame:
         """
@@ -120,90 +224,118 @@ class EnhancedTaiwanStockDataFetcher:
             days: 查詢天數
 
         Returns:
-            包含股價資料的 DataFrame
+            包含股價資料的 DataFrame；MISS_TTL 內曾查無資料時直接回傳空表
         """
+        if self._recent_miss(stock_id):
+            return pd.DataFrame()
+
         for attempt in range(self.max_retries):
             try:
                 df = self._try_online(stock_id, days)
                 if not df.empty:
                     return df
+            except Exception:
+                pass
 
-                # 如果資料為空，等待後重試
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-
-            except Exception as e:
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                else:
-                    # 最後一次嘗試失敗，記錄錯誤
-                    pass
+            # 指數退避加隨機抖動，避免被限流時以固定間隔連續重試
+            if attempt < self.max_retries - 1:
+                delay = self.retry_delay * (2 ** attempt) * (1 + random.random() * 0.5)
+                time.sleep(min(delay, self.MAX_RETRY_DELAY))
 
+        self._record_miss(stock_id)
         return pd.DataFrame()
 
+    def _recent_miss(self, stock_id: str) -> bool:
+        """是否在 MISS_TTL 內查無資料（本實例或共用快取的記錄）"""
+        if self._misses.get(stock_id, 0) > time.monotonic():
+            return True
+        return bool(self.use_cache and cache_manager
+                    and cache_manager.get(_cache_key('miss', stock_id)))
+
+    def _record_miss(self, stock_id: str) -> None:
+        """記錄重試用盡仍查無資料，並寫入共用快取供其他實例使用"""
+        self._misses[stock_id] = time.monotonic() + self.MISS_TTL
+        if self.use_cache and cache_manager:
+            cache_manager.set(_cache_key('miss', stock_id), True, ttl=self.MISS_TTL)
+
     def _try_online(self, stock_id: str, days: int) -> pd.DataFrame:
         """嘗試從線上獲取資料"""
         try:
             end = datetime.now()
             start = end - timedelta(days=days+30)
 
-            for sfx in ['.TW', '.TWO']:
+            for sfx in self._suffixes(stock_id):
                 try:
-                    with SuppressOutput():
-                        df = yf.download(
-                            f"{stock_id}{sfx}",
-                            start=start,
-                            end=end,
-                            progress=False
-                        )
+                    df = yf.download(
+                        f"{stock_id}{sfx}",
+                        start=start,
+                        end=end,
+                        progress=False,
+                        multi_level_index=False  # 單檔查詢直接回傳單層欄位
+                    )
 
                     if not df.empty:
-                        df = df.rename(columns={
-                            'Open': '開盤價',
-                            'High': '最高價',
-                            'Low': '最低價',
-                            'Close': '收盤價',
-                            'Volume': '成交量'
-                        })
-                        return df[['開盤價', '最高價', '最低價', '收盤價', '成交量']].tail(days)
+                        self._remember_suffix(stock_id, sfx)
+                        # 先截取需要的列與欄，再直接指定中文欄名
+                        df = df.tail(days)[_YF_COLS]
+                        df.columns = _PRICE_COLS
+                        return df
 
                 except Exception:
                     continue
 
+            # 已知市場也查不到時清除記錄，下次重試再兩個後綴都嘗試
+            self._forget_suffix(stock_id)
+
         except Exception:
             pass
 
         return pd.DataFrame()
 
+    def _suffixes(self, stock_id: str) -> List[str]:
+        """回傳要嘗試的後綴；已知市場時只查該市場，否則 .TW、.TWO 依序嘗試"""
+        hint = self._suffix_hint.get(stock_id)
+        if hint is None and self.use_cache and cache_manager:
+            hint = cache_manager.get(_cache_key('meta', stock_id))
+        return [hint] if hint else ['.TW', '.TWO']
+
+    def _remember_suffix(self, stock_id: str, sfx: str) -> None:
+        """記錄查詢成功的市場後綴，並寫入共用快取供其他實例使用"""
+        self._suffix_hint[stock_id] = sfx
+        if self.use_cache and cache_manager:
+            cache_manager.set(_cache_key('meta', stock_id), sfx, ttl=self.SUFFIX_TTL)
+
+    def _forget_suffix(self, stock_id: str) -> None:
+        """清除市場後綴記錄"""
+        self._suffix_hint.pop(stock_id, None)
+        if self.use_cache and cache_manager:
+            cache_manager.delete(_cache_key('meta', stock_id))
+
     def _ref_data(self, sid: str, days: int) -> pd.DataFrame:
         """生成參考資料"""
-        bp = self.reference_prices.get(sid, 100.0)
+        bp = _REFERENCE_PRICES.get(sid, 100.0)
         dates = pd.date_range(end=datetime.now(), periods=days, freq='D')
-        np.random.seed(int(sid) + days)
+        rng = np.random.default_rng(int(sid) + days)
+        volatility = bp * 0.012
 
         # 生成價格序列（隨機遊走）
-        returns = np.random.randn(days) * bp * 0.012
-        prices = bp + np.cumsum(returns)
-
-        data = []
-        for i in range(days):
-            price = max(prices[i], bp * 0.7)
-            volatility = bp * 0.012
-
-            high = price + abs(np.random.randn() * volatility)
-            low = price - abs(np.random.randn() * volatility)
-            open_price = price + np.random.randn() * volatility * 0.3
-            close = price + np.random.randn() * volatility * 0.3
-
-            data.append({
-                '開盤價': round(max(open_price, low + 0.1), 2),
-                '最高價': round(max(high, open_price, close), 2),
-                '最低價': round(min(low, open_price, close), 2),
-                '收盤價': round(max(close, low + 0.1), 2),
-                '成交量': int(abs(np.random.randn() * 8000000) + 5000000)
-            })
-
-        return pd.DataFrame(data, index=dates)
+        returns = rng.standard_normal(days) * volatility
+        prices = np.maximum(bp + np.cumsum(returns), bp * 0.7)
+
+        # 一次產生所有K線的擾動：高、低、開、收、量
+        noise = rng.standard_normal((days, 5))
+        high = prices + np.abs(noise[:, 0]) * volatility
+        low = prices - np.abs(noise[:, 1]) * volatility
+        open_price = prices + noise[:, 2] * volatility * 0.3
+        close = prices + noise[:, 3] * volatility * 0.3
+
+        return pd.DataFrame({
+            '開盤價': np.round(np.maximum(open_price, low + 0.1), 2),
+            '最高價': np.round(np.maximum.reduce([high, open_price, close]), 2),
+            '最低價': np.round(np.minimum.reduce([low, open_price, close]), 2),
+            '收盤價': np.round(np.maximum(close, low + 0.1), 2),
+            '成交量': (np.abs(noise[:, 4]) * 8000000 + 5000000).astype(np.int64)
+        }, index=dates)
 
     def get_realtime_price(self, sid: str) -> Dict:
         """獲取即時價格資訊"""
@@ -212,63 +344,31 @@ class EnhancedTaiwanStockDataFetcher:
             if df.empty:
                 return {}
 
-            latest = df.iloc[-1]
-            return {
-                '股票代碼': sid,
-                '股票名稱': self._get_stock_name(sid),
-                '當前價格': float(latest['收盤價']),
-                '開盤價': float(latest['開盤價']),
-                '最高價': float(latest['最高價']),
-                '最低價': float(latest['最低價']),
-                '成交量': int(latest['成交量']),
-                '時間': str(df.index[-1].date())
-            }
+            return self._quote(sid, df.iloc[-1])
         except Exception:
             return {}
 
-    def get_stock_info(self, sid: str) -> Dict:
-        """獲取股票基本資訊"""
-        # 檢查快取
-        cache_key = f"stock_info_{sid}"
-
-        if self.use_cache and cache_manager:
-            cached_data = cache_manager.get(cache_key)
-            if cached_data is not None:
-                return cached_data
-
-        # 從對照表獲取
-        if sid in self.stock_info_map:
-            name, industry, market_cap = self.stock_info_map[sid]
-        else:
-            name = f'股票{sid}'
-            industry = 'N/A'
-            market_cap = 0
-
-        # 計算市值（億元）
-        market_cap_display = f"{market_cap / 10000:.1f}億" if market_cap > 0 else 'N/A'
-
-        info = {
+    def _quote(self, sid: str, latest: pd.Series) -> Dict:
+        """由最新一根K線組出即時價格資訊"""
+        return {
             '股票代碼': sid,
-            '公司名稱': name,
-            '產業': industry,
-            '市值': market_cap_display,
-            '本益比': 'N/A',
-            '股價淨值比': 'N/A',
-            '52週最高': 'N/A',
-            '52週最低': 'N/A'
+            '股票名稱': self._get_stock_name(sid),
+            '當前價格': round(float(latest['收盤價']), 2),
+            '開盤價': round(float(latest['開盤價']), 2),
+            '最高價': round(float(latest['最高價']), 2),
+            '最低價': round(float(latest['最低價']), 2),
+            '成交量': int(latest['成交量']),
+            '時間': str(latest.name.date())
         }
 
-        # 存入快取
-        if self.use_cache and cache_manager:
-            cache_ttl = settings.get('cache.stock_info_ttl', 3600) if settings else 3600
-            cache_manager.set(cache_key, info, ttl=cache_ttl)
-
-        return info
+    def get_stock_info(self, sid: str) -> Dict:
+        """獲取股票基本資訊（資料皆來自靜態對照表，不經快取管理器）"""
+        return dict(_static_info(sid))
 
     def _get_stock_name(self, sid: str) -> str:
         """獲取股票名稱"""
-        if sid in self.stock_info_map:
-            return self.stock_info_map[sid][0]
+        if sid in _STOCK_INFO_MAP:
+            return _STOCK_INFO_MAP[sid][0]
         return f'股票{sid}'
 
     def get_top_stocks(self) -> List[Dict]:
@@ -278,14 +378,76 @@ class EnhancedTaiwanStockDataFetcher:
             '2881', '2886', '2891', '2303', '2308'
         ]
 
+        # 已在快取中的直接使用，其餘一次批次下載並寫回快取，
+        # 之後個股查詢（如 get_realtime_price）不必再連線
+        recent = {}
+        for sid in top_stock_ids:
+            cached_df = self._cached_price(sid, 1)
+            if cached_df is not None:
+                recent[sid] = cached_df
+
+        missing = [sid for sid in top_stock_ids if sid not in recent]
+        if missing:
+            fetched = self._download_recent(missing)
+            for sid, df in fetched.items():
+                self._store_price(sid, len(df), df)
+            recent.update(fetched)
+
+        # 批次下載仍缺漏的代碼並行逐檔查詢
+        still_missing = [sid for sid in top_stock_ids if sid not in recent]
+        fallback = dict(zip(still_missing, IO_POOL.map(self.get_realtime_price, still_missing)))
+
         results = []
         for sid in top_stock_ids:
-            price_info = self.get_realtime_price(sid)
+            if sid in recent:
+                price_info = self._quote(sid, recent[sid].iloc[-1])
+            else:
+                price_info = fallback[sid]
             if price_info:
                 results.append(price_info)
 
         return results
 
+    def _download_recent(self, stock_ids: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        以單次 yf.download 批次取得多檔股票近一個月的K線
+
+        先以 .TW 查詢全部代碼，取不到的再以 .TWO 查詢一次。
+
+        Returns:
+            股票代碼 -> 價格 DataFrame（中文欄位），取不到的代碼不列入
+        """
+        frames = {}
+        for sfx in ['.TW', '.TWO']:
+            pending = [sid for sid in stock_ids if sid not in frames]
+            if not pending:
+                break
+
+            try:
+                raw = yf.download(
+                    ' '.join(f"{sid}{sfx}" for sid in pending),
+                    period='1mo',
+                    group_by='ticker',
+                    threads=True,
+                    progress=False,
+                    auto_adjust=True
+                )
+            except Exception:
+                continue
+
+            for sid in pending:
+                try:
+                    df = raw[f"{sid}{sfx}"].dropna(subset=['Close'])
+                except KeyError:
+                    continue
+                if not df.empty:
+                    self._remember_suffix(sid, sfx)
+                    df = df[_YF_COLS]
+                    df.columns = _PRICE_COLS
+                    frames[sid] = df.fillna({'成交量': 0}).astype(_PRICE_DTYPES)
+
+        return frames
+
     def clear_cache(self) -> None:
         """清除所有快取"""
         if cache_manager:
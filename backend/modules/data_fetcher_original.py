@@ -7,10 +7,19 @@ import twstock
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from typing import Optional, Dict, List
 import requests
 from bs4 import BeautifulSoup
 
+from backend.utils.executors import IO_POOL
+
+# Yahoo 英文欄位 -> 中文欄位（唯讀常數）
+_COL_MAP = MappingProxyType({
+    'Open': '開盤價', 'High': '最高價', 'Low': '最低價', 'Close': '收盤價', 'Volume': '成交量'
+})
+_PRICE_COLS = tuple(_COL_MAP.values())
+
 
 class TaiwanStockDataFetcher:
     """台灣股票資料獲取器"""
@@ -66,18 +75,12 @@ class TaiwanStockDataFetcher:
                 print(f"警告: 無法從 yfinance 獲取 {stock_id} 的資料")
                 return pd.DataFrame()
 
-            # 重新命名欄位為中文
-            df = df.rename(columns={
-                'Open': '開盤價',
-                'High': '最高價',
-                'Low': '最低價',
-                'Close': '收盤價',
-                'Volume': '成交量'
-            })
+            # 先取最近的天數，再將欄位重新命名為中文
+            df = df.tail(days).rename(columns=_COL_MAP)
 
-            # 只保留需要的欄位，並取最近的天數
-            available_columns = [col for col in ['開盤價', '最高價', '最低價', '收盤價', '成交量'] if col in df.columns]
-            df = df[available_columns].tail(days)
+            # 只保留需要的欄位
+            available_columns = [col for col in _PRICE_COLS if col in df.columns]
+            df = df[available_columns]
 
             return df
 
@@ -193,13 +196,24 @@ class TaiwanStockDataFetcher:
             '2308',  # 台達電
         ]
 
-        result = []
-        for stock_id in popular_stocks:
-            realtime = self.get_realtime_price(stock_id)
-            if realtime:
-                result.append(realtime)
+        return [realtime for realtime in IO_POOL.map(self.get_realtime_price, popular_stocks)
+                if realtime]
+
 
-        return result
+# 這裡提供示範資料結構
+# 實際應用中需要從證交所或其他來源爬取
+_SAMPLE_WARRANTS = pd.DataFrame({
+    '權證代碼': ['123456', '123457', '123458'],
+    '權證名稱': ['XX認購01', 'YY認購02', 'ZZ認售01'],
+    '標的股票': ['2330', '2317', '2454'],
+    '行使比例': [0.5, 0.3, 0.4],
+    '履約價': [600, 100, 800],
+    '到期日': ['2024-12-31', '2024-11-30', '2024-10-31'],
+    '隱含波動率': [25.5, 30.2, 28.7],
+    '實質槓桿': [5.2, 6.1, 4.8],
+})
+# 標的股票 -> 列位置，篩選時不必逐列比對
+_SAMPLE_BY_UNDERLYING = _SAMPLE_WARRANTS.groupby('標的股票').indices
 
 
 class WarrantDataFetcher:
@@ -207,6 +221,8 @@ class WarrantDataFetcher:
 
     def __init__(self):
         self.base_url = "https://www.cnyes.com/warrant/"
+        self.warrants_df = _SAMPLE_WARRANTS  # 唯讀共用，勿修改
+        self._by_underlying = _SAMPLE_BY_UNDERLYING
 
     def get_warrant_list(self, stock_id: str = None) -> pd.DataFrame:
         """
@@ -218,25 +234,10 @@ class WarrantDataFetcher:
         Returns:
             權證資料 DataFrame
         """
-        # 這裡提供示範資料結構
-        # 實際應用中需要從證交所或其他來源爬取
-        sample_data = {
-            '權證代碼': ['123456', '123457', '123458'],
-            '權證名稱': ['XX認購01', 'YY認購02', 'ZZ認售01'],
-            '標的股票': ['2330', '2317', '2454'],
-            '行使比例': [0.5, 0.3, 0.4],
-            '履約價': [600, 100, 800],
-            '到期日': ['2024-12-31', '2024-11-30', '2024-10-31'],
-            '隱含波動率': [25.5, 30.2, 28.7],
-            '實質槓桿': [5.2, 6.1, 4.8],
-        }
-
-        df = pd.DataFrame(sample_data)
-
-        if stock_id:
-            df = df[df['標的股票'] == stock_id]
+        if not stock_id:
+            return self.warrants_df.copy()
 
-        return df
+        return self.warrants_df.iloc[self._by_underlying.get(stock_id, [])]
 
     def calculate_warrant_value(self, warrant_info: Dict) -> Dict:
         """
@@ -7,14 +7,41 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from typing import Dict, List
 import warnings
 import logging
 
+from backend.utils.executors import IO_POOL
+
 # 設定 logging
 logging.getLogger('yfinance').setLevel(logging.CRITICAL)
 warnings.filterwarnings('ignore')
 
+# Yahoo 英文欄位 -> 中文欄位（唯讀常數）
+_COL_MAP = MappingProxyType({
+    'Open': '開盤價', 'High': '最高價', 'Low': '最低價', 'Close': '收盤價', 'Volume': '成交量'
+})
+_PRICE_COLS = tuple(_COL_MAP.values())
+
+# 2024年1月的參考價格（真實市場價格，唯讀常數）
+_REFERENCE_PRICES = MappingProxyType({
+    '2330': 618.0,   # 台積電 2024-01 參考價
+    '2317': 109.0,   # 鴻海
+    '2454': 1095.0,  # 聯發科
+    '2412': 122.5,   # 中華電
+    '2882': 61.2,    # 國泰金
+    '2881': 85.1,    # 富邦金
+    '2886': 37.45,   # 兆豐金
+    '2891': 27.95,   # 中信金
+    '2303': 54.9,    # 聯電
+    '2308': 371.0,   # 台達電
+    '2382': 256.0,   # 廣達
+    '2885': 24.15,   # 元大金
+    '3008': 32.8,    # 大立光
+    '2892': 19.4,    # 第一金
+})
+
 
 class TaiwanStockDataFetcher:
     """台灣股票資料獲取器"""
@@ -75,17 +102,12 @@ class TaiwanStockDataFetcher:
                 )
 
             if not df.empty:
-                df = df.rename(columns={
-                    'Open': '開盤價',
-                    'High': '最高價',
-                    'Low': '最低價',
-                    'Close': '收盤價',
-                    'Volume': '成交量'
-                })
-
-                available_columns = [col for col in ['開盤價', '最高價', '最低價', '收盤價', '成交量']
+                # 先截取最近的天數再改名，只處理需要的列
+                df = df.tail(days).rename(columns=_COL_MAP)
+
+                available_columns = [col for col in _PRICE_COLS
                                    if col in df.columns]
-                df = df[available_columns].tail(days)
+                df = df[available_columns]
 
             return df
 
@@ -97,62 +119,39 @@ class TaiwanStockDataFetcher:
         備援資料方案
         基於 2024-01 的參考價格生成合理數據
         """
-        # 2024年1月的參考價格（真實市場價格）
-        reference_prices = {
-            '2330': 618.0,   # 台積電 2024-01 參考價
-            '2317': 109.0,   # 鴻海
-            '2454': 1095.0,  # 聯發科
-            '2412': 122.5,   # 中華電
-            '2882': 61.2,    # 國泰金
-            '2881': 85.1,    # 富邦金
-            '2886': 37.45,   # 兆豐金
-            '2891': 27.95,   # 中信金
-            '2303': 54.9,    # 聯電
-            '2308': 371.0,   # 台達電
-            '2412': 122.5,   # 中華電
-            '2382': 256.0,   # 廣達
-            '2885': 24.15,   # 元大金
-            '3008': 32.8,    # 大立光
-            '2892': 19.4,    # 第一金
-        }
-
-        base_price = reference_prices.get(stock_id, 100.0)
+        base_price = _REFERENCE_PRICES.get(stock_id, 100.0)
 
         # 生成日期
         end_date = datetime.now()
         dates = pd.date_range(end=end_date, periods=days, freq='D')
 
-        # 使用股票代碼作為隨機種子，確保每次生成相同
-        np.random.seed(int(stock_id) + days)
-
-        # 生成相對穩定的價格趨勢
-        trend = np.cumsum(np.random.randn(days) * base_price * 0.015)
-        prices = base_price + trend
-
-        data = []
-        for i, date in enumerate(dates):
-            price = max(prices[i], base_price * 0.5)  # 避免價格過低
-            volatility = base_price * 0.015
-
-            high = price + abs(np.random.randn() * volatility)
-            low = price - abs(np.random.randn() * volatility)
-            open_price = price + np.random.randn() * volatility * 0.3
-            close_price = price + np.random.randn() * volatility * 0.3
+        # 使用股票代碼作為隨機種子，確保每次生成相同；
+        # 以區域產生器取樣，不改動 NumPy 全域亂數狀態
+        rng = np.random.default_rng(int(stock_id) + days)
 
-            high = max(high, open_price, close_price, low + volatility * 0.5)
-            low = min(low, open_price, close_price)
+        volatility = base_price * 0.015
 
-            volume = abs(np.random.randn() * 8000000) + 5000000
-
-            data.append({
-                '開盤價': round(max(open_price, low + 0.1), 2),
-                '最高價': round(high, 2),
-                '最低價': round(max(low, 0.1), 2),
-                '收盤價': round(max(close_price, low + 0.1), 2),
-                '成交量': int(volume)
-            })
-
-        df = pd.DataFrame(data, index=dates)
+        # 生成相對穩定的價格趨勢
+        trend = np.cumsum(rng.standard_normal(days) * volatility)
+        prices = np.maximum(base_price + trend, base_price * 0.5)  # 避免價格過低
+
+        # 一次產生所有K線的擾動：高、低、開、收、量
+        noise = rng.standard_normal((5, days))
+        high = prices + np.abs(noise[0]) * volatility
+        low = prices - np.abs(noise[1]) * volatility
+        open_price = prices + noise[2] * volatility * 0.3
+        close_price = prices + noise[3] * volatility * 0.3
+
+        high = np.maximum.reduce([high, open_price, close_price, low + volatility * 0.5])
+        low = np.minimum.reduce([low, open_price, close_price])
+
+        df = pd.DataFrame({
+            '開盤價': np.round(np.maximum(open_price, low + 0.1), 2),
+            '最高價': np.round(high, 2),
+            '最低價': np.round(np.maximum(low, 0.1), 2),
+            '收盤價': np.round(np.maximum(close_price, low + 0.1), 2),
+            '成交量': (np.abs(noise[4]) * 8000000 + 5000000).astype(np.int64)
+        }, index=dates)
         return df
 
     def get_realtime_price(self, stock_id: str) -> Dict:
@@ -248,41 +247,47 @@ class TaiwanStockDataFetcher:
         popular_stocks = ['2330', '2317', '2454', '2412', '2882',
                          '2881', '2886', '2891', '2303', '2308']
 
-        result = []
-        for stock_id in popular_stocks:
-            realtime = self.get_realtime_price(stock_id)
-            if realtime:
-                result.append(realtime)
+        return [realtime for realtime in IO_POOL.map(self.get_realtime_price, popular_stocks)
+                if realtime]
 
-        return result
+
+# 示範權證資料，以權證代碼為索引（保留欄位），單筆查詢用 .loc
+_SAMPLE_WARRANTS = pd.DataFrame({
+    '權證代碼': ['123456', '123457', '123458'],
+    '權證名稱': ['XX認購01', 'YY認購02', 'ZZ認售01'],
+    '標的股票': ['2330', '2317', '2454'],
+    '行使比例': [0.5, 0.3, 0.4],
+    '履約價': [600, 100, 800],
+    '到期日': ['2024-12-31', '2024-11-30', '2024-10-31'],
+    '隱含波動率': [25.5, 30.2, 28.7],
+    '實質槓桿': [5.2, 6.1, 4.8],
+    '權證價格': [10.0, 5.0, 12.0],
+}).set_index('權證代碼', drop=False)
+# 標的股票 -> 列位置
+_SAMPLE_BY_UNDERLYING = _SAMPLE_WARRANTS.groupby('標的股票').indices
 
 
 class WarrantDataFetcher:
     """權證資料獲取器"""
 
     def __init__(self):
-        pass
+        self.warrants_df = _SAMPLE_WARRANTS  # 唯讀共用，勿修改
+        self._by_underlying = _SAMPLE_BY_UNDERLYING
 
     def get_warrant_list(self, stock_id: str = None) -> pd.DataFrame:
         """獲取權證列表（示範資料）"""
-        sample_data = {
-            '權證代碼': ['123456', '123457', '123458'],
-            '權證名稱': ['XX認購01', 'YY認購02', 'ZZ認售01'],
-            '標的股票': ['2330', '2317', '2454'],
-            '行使比例': [0.5, 0.3, 0.4],
-            '履約價': [600, 100, 800],
-            '到期日': ['2024-12-31', '2024-11-30', '2024-10-31'],
-            '隱含波動率': [25.5, 30.2, 28.7],
-            '實質槓桿': [5.2, 6.1, 4.8],
-            '權證價格': [10.0, 5.0, 12.0],
-        }
+        if not stock_id:
+            return self.warrants_df.reset_index(drop=True)
 
-        df = pd.DataFrame(sample_data)
+        positions = self._by_underlying.get(stock_id, [])
+        return self.warrants_df.iloc[positions].reset_index(drop=True)
 
-        if stock_id:
-            df = df[df['標的股票'] == stock_id]
-
-        return df
+    def get_warrant_detail(self, warrant_code: str) -> Dict:
+        """獲取單一權證資訊（示範資料）"""
+        try:
+            return self.warrants_df.loc[warrant_code].to_dict()
+        except KeyError:
+            return {}
 
     def calculate_warrant_value(self, warrant_info: Dict) -> Dict:
         """計算權證價值"""
@@ -12,14 +12,19 @@
 這是解決 429 錯誤的最完整方案！
 """
 
+import numpy as np
 import pandas as pd
-import requests
+from bisect import bisect_right
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from typing import Optional, Dict, List
 import logging
+import threading
 import warnings
 import os
 
+from cachetools import TTLCache
+
 # 完全靜音模式
 warnings.filterwarnings('ignore')
 os.environ['PYTHONWARNINGS'] = 'ignore'
@@ -28,21 +33,12 @@ os.environ['PYTHONWARNINGS'] = 'ignore'
 logging.getLogger('yfinance').setLevel(logging.CRITICAL)
 logging.getLogger('urllib3').setLevel(logging.CRITICAL)
 
-# 嘗試導入 yfinance
-_yf_available = False
-try:
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        import yfinance as yf
-        _yf_available = True
-except:
-    pass
-
 from backend.utils.rate_limiter import (
     get_rate_limiter,
     get_user_agent_rotator,
     get_retry_handler
 )
+from backend.utils.yf_loader import get_yf
 
 # 靜默導入 FinMind
 FINMIND_AVAILABLE = False
@@ -59,6 +55,61 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 logger.setLevel(logging.CRITICAL)
 
+# 市值顯示單位：_MC_THRESHOLDS 以 bisect 找出區間，再取 (除數, 格式)
+_MC_THRESHOLDS = (1e8, 1e12)
+_MC_BUCKETS = ((1, '{:,.0f}'), (1e8, '{:.2f} 億'), (1e12, '{:.2f} 兆'))
+
+# 常用股票中文名稱（唯讀常數，所有實例共用）
+_STOCK_NAMES = MappingProxyType({
+    '2330': '台積電', '2454': '聯發科', '2303': '聯電',
+    '2317': '鴻海', '2308': '台達電', '2382': '廣達',
+    '2882': '國泰金', '2881': '富邦金', '2886': '兆豐金',
+    '2412': '中華電', '0050': '元大台灣50',
+})
+
+# Yahoo 產業類別中譯（唯讀常數）
+_SECTOR_TRANSLATIONS = MappingProxyType({
+    'Technology': '科技業', 'Financial Services': '金融業',
+    'Consumer Cyclical': '消費週期性', 'Communication Services': '通訊服務',
+    'Industrials': '工業', 'Basic Materials': '基礎材料',
+})
+
+# Yahoo 細分產業中譯（唯讀常數）
+_INDUSTRY_TRANSLATIONS = MappingProxyType({
+    'Semiconductors': '半導體', 'Consumer Electronics': '消費電子',
+    'Electronic Components': '電子元件', 'Telecom Services': '電信服務',
+})
+
+
+# 查不到資訊時的備援欄位（代碼與名稱於呼叫時填入）
+_FALLBACK_INFO = MappingProxyType({
+    '股票代碼': None, '公司名稱': None, '產業類別': '其他',
+    '細分產業': '其他', '市值': 'N/A', '本益比': 'N/A',
+    '股價淨值比': 'N/A', '52週最高': 'N/A', '52週最低': 'N/A',
+    '殖利率': 'N/A', '當前價格': None
+})
+
+# 台股 ETF 代碼皆以 00 開頭（0050、0056、00878…）
+_ETF_PREFIX = '00'
+
+# 參考價格（2026-01-14 市場價格，唯讀常數）
+_REFERENCE_PRICES = MappingProxyType({
+    '2330': {'base_price': 1710, 'volatility': 0.015, 'name': '台積電'},
+    '2317': {'base_price': 215, 'volatility': 0.02, 'name': '鴻海'},
+    '2454': {'base_price': 1350, 'volatility': 0.02, 'name': '聯發科'},
+    '2308': {'base_price': 385, 'volatility': 0.015, 'name': '台達電'},
+    '2382': {'base_price': 340, 'volatility': 0.02, 'name': '廣達'},
+    '2303': {'base_price': 52, 'volatility': 0.02, 'name': '聯電'},
+    '2881': {'base_price': 98, 'volatility': 0.015, 'name': '富邦金'},
+    '2882': {'base_price': 72, 'volatility': 0.015, 'name': '國泰金'},
+    '2886': {'base_price': 48, 'volatility': 0.015, 'name': '兆豐金'},
+    '2412': {'base_price': 132, 'volatility': 0.01, 'name': '中華電'},
+    '2891': {'base_price': 35, 'volatility': 0.015, 'name': '中信金'},
+    '3008': {'base_price': 2150, 'volatility': 0.02, 'name': '大立光'},
+    '2603': {'base_price': 215, 'volatility': 0.025, 'name': '長榮'},
+    '0050': {'base_price': 195, 'volatility': 0.01, 'name': '元大台灣50'},
+})
+
 
 class UltimateTaiwanStockDataFetcher:
     """
@@ -72,6 +123,13 @@ class UltimateTaiwanStockDataFetcher:
     5. 錯誤處理 (友善提示)
     """
 
+    # 股票資訊快取有效秒數
+    INFO_CACHE_TTL = 900
+    # 歷史股價與即時報價快取有效秒數
+    PRICE_CACHE_TTL = 60
+    # 各快取最大筆數，超過時淘汰最久未用者
+    CACHE_MAX_ENTRIES = 1024
+
     def __init__(self, finmind_token: Optional[str] = None):
         """
         初始化資料獲取器
@@ -93,6 +151,16 @@ class UltimateTaiwanStockDataFetcher:
             except Exception as e:
                 logger.warning(f"⚠️ FinMind 初始化失敗: {e}")
 
+        # 股票代碼 -> 查詢成功的市場後綴（.TW / .TWO）
+        self._suffix_hint: Dict[str, str] = {}
+        # 股票代碼 -> 格式化後的股票資訊
+        self._info_cache = TTLCache(maxsize=self.CACHE_MAX_ENTRIES, ttl=self.INFO_CACHE_TTL)
+        # (股票代碼, 天數) -> 價格 DataFrame
+        self._price_cache = TTLCache(maxsize=self.CACHE_MAX_ENTRIES, ttl=self.PRICE_CACHE_TTL)
+        # 股票代碼 -> 即時報價
+        self._quote_cache = TTLCache(maxsize=self.CACHE_MAX_ENTRIES, ttl=self.PRICE_CACHE_TTL)
+        self._cache_lock = threading.Lock()  # TTLCache 非執行緒安全
+
         # 統計資訊
         self.stats = {
             'yfinance_success': 0,
@@ -116,6 +184,12 @@ class UltimateTaiwanStockDataFetcher:
         Returns:
             DataFrame: 價格資料
         """
+        with self._cache_lock:
+            cached = self._price_cache.get((stock_id, days))
+        if cached is not None:
+            # 回傳完整複本，呼叫端修改內容不會寫回快取
+            return cached.copy()
+
         logger.info(f"🔍 開始獲取 {stock_id} 股價資料 ({days} 天)")
 
         # 第一層: yfinance (智能限流版)
@@ -123,7 +197,9 @@ class UltimateTaiwanStockDataFetcher:
         if not df.empty:
             self.stats['yfinance_success'] += 1
             logger.info(f"✅ [yfinance] 成功獲取 {stock_id} 資料")
-            return df
+            with self._cache_lock:
+                self._price_cache[(stock_id, days)] = df
+            return df.copy()
 
         # 第二層: FinMind (台股專用)
         if self.finmind_fetcher:
@@ -132,7 +208,9 @@ class UltimateTaiwanStockDataFetcher:
             if not df.empty:
                 self.stats['finmind_success'] += 1
                 logger.info(f"✅ [FinMind] 成功獲取 {stock_id} 資料")
-                return df
+                with self._cache_lock:
+                    self._price_cache[(stock_id, days)] = df
+                return df.copy()
 
         # 無法獲取資料，返回空 DataFrame（不使用假資料）
         logger.error(f"❌ 無法獲取 {stock_id} 的即時資料")
@@ -149,7 +227,8 @@ class UltimateTaiwanStockDataFetcher:
         使用 yf.download() 替代 Ticker.history() 以獲得更好的雲端相容性
         """
         # 檢查 yfinance 是否可用
-        if not _yf_available:
+        yf = get_yf()
+        if yf is None:
             return pd.DataFrame()
 
         try:
@@ -161,32 +240,28 @@ class UltimateTaiwanStockDataFetcher:
             start_date = end_date - timedelta(days=days + 30)
 
             # 3. 嘗試 .TW 和 .TWO 後綴
-            for suffix in ['.TW', '.TWO']:
+            for suffix in self._suffixes(stock_id):
                 ticker_symbol = f"{stock_id}{suffix}"
                 try:
                     # 使用 yf.download() - 雲端環境更穩定
                     def download_func():
-                        with warnings.catch_warnings():
-                            warnings.simplefilter("ignore")
-                            return yf.download(
-                                ticker_symbol,
-                                start=start_date,
-                                end=end_date,
-                                progress=False,
-                                auto_adjust=True,
-                                threads=False
-                            )
+                        return yf.download(
+                            ticker_symbol,
+                            start=start_date,
+                            end=end_date,
+                            progress=False,
+                            auto_adjust=True,
+                            threads=False,
+                            multi_level_index=False  # 單檔查詢直接回傳單層欄位
+                        )
 
                     df = self.retry_handler.execute_with_retry(download_func)
 
                     if df is not None and len(df) > 5:
-                        # 處理多層欄位名稱（download 可能返回 MultiIndex columns）
-                        if isinstance(df.columns, pd.MultiIndex):
-                            df.columns = df.columns.droplevel(1)
-
                         # 格式轉換
                         df_formatted = self._format_yfinance_dataframe(df)
                         if not df_formatted.empty:
+                            self._suffix_hint[stock_id] = suffix
                             return df_formatted.tail(days)
                 except Exception:
                     continue
@@ -205,41 +280,6 @@ class UltimateTaiwanStockDataFetcher:
 
             return pd.DataFrame()
 
-    def _create_custom_session(self) -> requests.Session:
-        """
-        創建自訂 HTTP Session
-
-        特點：
-        - 隨機 User-Agent
-        - 模擬瀏覽器 Headers
-        - 設定超時時間
-        """
-        session = requests.Session()
-
-        # 隨機選擇 User-Agent
-        user_agent = self.ua_rotator.get_random()
-
-        # 設定 Headers（模擬瀏覽器）
-        session.headers.update({
-            'User-Agent': user_agent,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9,zh-TW;q=0.8,zh;q=0.7',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Cache-Control': 'max-age=0',
-        })
-
-        # 設定超時
-        session.request = lambda *args, **kwargs: requests.Session.request(
-            session, *args, **{**kwargs, 'timeout': 15}
-        )
-
-        return session
-
     def _try_finmind(self, stock_id: str, days: int) -> pd.DataFrame:
         """
         使用 FinMind 獲取資料
@@ -274,31 +314,11 @@ class UltimateTaiwanStockDataFetcher:
         Returns:
             DataFrame: 參考價格資料
         """
-        # 參考價格字典（2026-01-14 最新市場價格）
-        reference_prices = {
-            '2330': {'base_price': 1710, 'volatility': 0.015, 'name': '台積電'},
-            '2317': {'base_price': 215, 'volatility': 0.02, 'name': '鴻海'},
-            '2454': {'base_price': 1350, 'volatility': 0.02, 'name': '聯發科'},
-            '2308': {'base_price': 385, 'volatility': 0.015, 'name': '台達電'},
-            '2382': {'base_price': 340, 'volatility': 0.02, 'name': '廣達'},
-            '2303': {'base_price': 52, 'volatility': 0.02, 'name': '聯電'},
-            '2881': {'base_price': 98, 'volatility': 0.015, 'name': '富邦金'},
-            '2882': {'base_price': 72, 'volatility': 0.015, 'name': '國泰金'},
-            '2886': {'base_price': 48, 'volatility': 0.015, 'name': '兆豐金'},
-            '2412': {'base_price': 132, 'volatility': 0.01, 'name': '中華電'},
-            '2891': {'base_price': 35, 'volatility': 0.015, 'name': '中信金'},
-            '3008': {'base_price': 2150, 'volatility': 0.02, 'name': '大立光'},
-            '2603': {'base_price': 215, 'volatility': 0.025, 'name': '長榮'},
-            '0050': {'base_price': 195, 'volatility': 0.01, 'name': '元大台灣50'},
-        }
-
-        if stock_id not in reference_prices:
+        if stock_id not in _REFERENCE_PRICES:
             logger.warning(f"⚠️ 無參考資料: {stock_id}")
             return pd.DataFrame()
 
-        import numpy as np
-
-        ref_data = reference_prices[stock_id]
+        ref_data = _REFERENCE_PRICES[stock_id]
         base_price = ref_data['base_price']
         volatility = ref_data['volatility']
 
@@ -306,16 +326,17 @@ class UltimateTaiwanStockDataFetcher:
         end_date = datetime.now()
         dates = pd.date_range(end=end_date, periods=days, freq='D')
 
-        # 生成隨機價格變動
-        np.random.seed(hash(stock_id) % 2**32)
-        returns = np.random.normal(0.001, volatility, days)
+        # 生成隨機價格變動（區域產生器，不改動 NumPy 全域亂數狀態；
+        # 參考表的代碼皆為數字，以代碼為種子，重啟後結果相同）
+        rng = np.random.default_rng(int(stock_id))
+        returns = rng.normal(0.001, volatility, days)
         prices = base_price * (1 + returns).cumprod()
 
         # 生成 OHLC
-        opens = prices * (1 + np.random.normal(0, 0.005, days))
-        highs = np.maximum(opens, prices) * (1 + np.abs(np.random.normal(0, 0.01, days)))
-        lows = np.minimum(opens, prices) * (1 - np.abs(np.random.normal(0, 0.01, days)))
-        volumes = np.random.randint(10000, 50000, days) * 1000
+        opens = prices * (1 + rng.normal(0, 0.005, days))
+        highs = np.maximum(opens, prices) * (1 + np.abs(rng.normal(0, 0.01, days)))
+        lows = np.minimum(opens, prices) * (1 - np.abs(rng.normal(0, 0.01, days)))
+        volumes = rng.integers(10000, 50000, days) * 1000
 
         df = pd.DataFrame({
             '開盤價': opens,
@@ -328,6 +349,12 @@ class UltimateTaiwanStockDataFetcher:
         logger.info(f"📊 使用參考資料: {ref_data['name']} ({stock_id})")
         return df
 
+    def _suffixes(self, stock_id: str) -> List[str]:
+        """回傳要嘗試的後綴；曾查詢成功的市場優先"""
+        if self._suffix_hint.get(stock_id) == '.TWO':
+            return ['.TWO', '.TW']
+        return ['.TW', '.TWO']
+
     def _format_ticker(self, stock_id: str) -> str:
         """格式化股票代碼"""
         if len(stock_id) == 4 and stock_id.isdigit():
@@ -359,106 +386,189 @@ class UltimateTaiwanStockDataFetcher:
         Returns:
             Dict: 股票資訊
         """
-        if not _yf_available:
+        with self._cache_lock:
+            cached = self._info_cache.get(stock_id)
+        if cached is not None:
+            return dict(cached)
+
+        # ETF 在 Yahoo 沒有本益比、淨值比等基本面，不必多打一次 Ticker.info
+        if stock_id.startswith(_ETF_PREFIX):
+            return self._get_etf_info(stock_id)
+
+        yf = get_yf()
+        if yf is None:
             return self._get_fallback_info(stock_id)
 
         # 嘗試從 yfinance 獲取資訊
-        for sfx in ['.TW', '.TWO']:
+        for sfx in self._suffixes(stock_id):
             try:
                 self.rate_limiter.wait_if_needed()
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    ticker = yf.Ticker(f"{stock_id}{sfx}")
-                    info = ticker.info
+                ticker = yf.Ticker(f"{stock_id}{sfx}")
+                info = ticker.info
 
-                    # 檢查是否有有效資料
-                    if not info or info.get('regularMarketPrice') is None:
-                        continue
+                # 檢查是否有有效資料
+                if not info or info.get('regularMarketPrice') is None:
+                    continue
 
-                    # 格式化市值
-                    market_cap = info.get('marketCap')
-                    if market_cap:
-                        if market_cap >= 1e12:
-                            market_cap_str = f"{market_cap/1e12:.2f} 兆"
-                        elif market_cap >= 1e8:
-                            market_cap_str = f"{market_cap/1e8:.2f} 億"
-                        else:
-                            market_cap_str = f"{market_cap:,.0f}"
-                    else:
-                        market_cap_str = 'N/A'
-
-                    # 本益比
-                    pe_ratio = info.get('trailingPE')
-                    pe_str = f"{pe_ratio:.2f}" if pe_ratio else 'N/A'
-
-                    # 股價淨值比
-                    pb_ratio = info.get('priceToBook')
-                    pb_str = f"{pb_ratio:.2f}" if pb_ratio else 'N/A'
-
-                    # 52週高低
-                    week52_high = info.get('fiftyTwoWeekHigh')
-                    week52_low = info.get('fiftyTwoWeekLow')
-                    w52h_str = f"{week52_high:.2f}" if week52_high else 'N/A'
-                    w52l_str = f"{week52_low:.2f}" if week52_low else 'N/A'
-
-                    # 產業翻譯
-                    sector = info.get('sector', '')
-                    industry = info.get('industry', '')
-                    sector_tw = self._translate_sector(sector)
-                    industry_tw = self._translate_industry(industry)
-
-                    # 公司名稱
-                    stock_names = {
-                        '2330': '台積電', '2454': '聯發科', '2303': '聯電',
-                        '2317': '鴻海', '2308': '台達電', '2382': '廣達',
-                        '2882': '國泰金', '2881': '富邦金', '2886': '兆豐金',
-                        '2412': '中華電', '0050': '元大台灣50',
-                    }
-                    company_name = stock_names.get(stock_id) or info.get('shortName') or info.get('longName') or stock_id
-
-                    return {
-                        '股票代碼': stock_id,
-                        '公司名稱': company_name,
-                        '產業類別': sector_tw,
-                        '細分產業': industry_tw,
-                        '市值': market_cap_str,
-                        '本益比': pe_str,
-                        '股價淨值比': pb_str,
-                        '52週最高': w52h_str,
-                        '52週最低': w52l_str,
-                        '殖利率': f"{info.get('dividendYield', 0) * 100:.2f}%" if info.get('dividendYield') else 'N/A',
-                        '當前價格': info.get('regularMarketPrice') or info.get('previousClose'),
-                    }
+                # 格式化市值
+                market_cap = info.get('marketCap')
+                if market_cap:
+                    div, fmt = _MC_BUCKETS[bisect_right(_MC_THRESHOLDS, market_cap)]
+                    market_cap_str = fmt.format(market_cap / div)
+                else:
+                    market_cap_str = 'N/A'
+
+                # 本益比
+                pe_ratio = info.get('trailingPE')
+                pe_str = f"{pe_ratio:.2f}" if pe_ratio else 'N/A'
+
+                # 股價淨值比
+                pb_ratio = info.get('priceToBook')
+                pb_str = f"{pb_ratio:.2f}" if pb_ratio else 'N/A'
+
+                # 52週高低
+                week52_high = info.get('fiftyTwoWeekHigh')
+                week52_low = info.get('fiftyTwoWeekLow')
+                w52h_str = f"{week52_high:.2f}" if week52_high else 'N/A'
+                w52l_str = f"{week52_low:.2f}" if week52_low else 'N/A'
+
+                # 產業翻譯
+                sector = info.get('sector', '')
+                industry = info.get('industry', '')
+                sector_tw = self._translate_sector(sector)
+                industry_tw = self._translate_industry(industry)
+
+                # 公司名稱
+                company_name = _STOCK_NAMES.get(stock_id) or info.get('shortName') or info.get('longName') or stock_id
+
+                result = {
+                    '股票代碼': stock_id,
+                    '公司名稱': company_name,
+                    '產業類別': sector_tw,
+                    '細分產業': industry_tw,
+                    '市值': market_cap_str,
+                    '本益比': pe_str,
+                    '股價淨值比': pb_str,
+                    '52週最高': w52h_str,
+                    '52週最低': w52l_str,
+                    '殖利率': f"{info.get('dividendYield', 0) * 100:.2f}%" if info.get('dividendYield') else 'N/A',
+                    '當前價格': info.get('regularMarketPrice') or info.get('previousClose'),
+                }
+                self._suffix_hint[stock_id] = sfx
+                with self._cache_lock:
+                    self._info_cache[stock_id] = result
+                return dict(result)
             except Exception:
                 continue
 
         return self._get_fallback_info(stock_id)
 
+    def _get_etf_info(self, stock_id: str) -> Dict:
+        """ETF 資訊：價格與 52 週高低取自歷史股價，基本面欄位維持 N/A"""
+        info = self._get_fallback_info(stock_id)
+        info['產業類別'] = info['細分產業'] = 'ETF'
+        df = self.get_stock_price(stock_id, days=365)
+        if df.empty:
+            return info
+        info['當前價格'] = float(df['收盤價'].iloc[-1])
+        info['52週最高'] = f"{df['最高價'].max():.2f}"
+        info['52週最低'] = f"{df['最低價'].min():.2f}"
+        with self._cache_lock:
+            self._info_cache[stock_id] = info
+        return dict(info)
+
     def _translate_sector(self, sector: str) -> str:
         """翻譯產業類別"""
-        translations = {
-            'Technology': '科技業', 'Financial Services': '金融業',
-            'Consumer Cyclical': '消費週期性', 'Communication Services': '通訊服務',
-            'Industrials': '工業', 'Basic Materials': '基礎材料',
-        }
-        return translations.get(sector, sector or '其他')
+        return _SECTOR_TRANSLATIONS.get(sector, sector or '其他')
 
     def _translate_industry(self, industry: str) -> str:
         """翻譯細分產業"""
-        translations = {
-            'Semiconductors': '半導體', 'Consumer Electronics': '消費電子',
-            'Electronic Components': '電子元件', 'Telecom Services': '電信服務',
-        }
-        return translations.get(industry, industry or '其他')
+        return _INDUSTRY_TRANSLATIONS.get(industry, industry or '其他')
 
     def _get_fallback_info(self, stock_id: str) -> Dict:
-        """備援資訊"""
-        return {
-            '股票代碼': stock_id, '公司名稱': stock_id, '產業類別': '其他',
-            '細分產業': '其他', '市值': 'N/A', '本益比': 'N/A',
-            '股價淨值比': 'N/A', '52週最高': 'N/A', '52週最低': 'N/A',
-            '殖利率': 'N/A', '當前價格': None
-        }
+        """備援資訊（共用模板，只填入代碼與名稱）"""
+        info = dict(_FALLBACK_INFO)
+        info['股票代碼'] = stock_id
+        info['公司名稱'] = _STOCK_NAMES.get(stock_id, stock_id)
+        return info
+
+    def get_realtime_price(self, stock_id: str) -> Dict:
+        """
+        獲取即時報價（使用 Ticker.fast_info 輕量端點）
+
+        fast_info 只取得行情資料，不必下載完整的公司檔案；
+        漲跌與漲跌幅在本地計算。fast_info 缺值時才退回 Ticker.info。
+
+        Args:
+            stock_id: 股票代碼
+
+        Returns:
+            Dict: 即時報價，失敗時為空字典
+        """
+        with self._cache_lock:
+            cached = self._quote_cache.get(stock_id)
+        if cached is not None:
+            return dict(cached)
+
+        yf = get_yf()
+        if yf is None:
+            return {}
+
+        for sfx in self._suffixes(stock_id):
+            try:
+                self.rate_limiter.wait_if_needed()
+                ticker = yf.Ticker(f"{stock_id}{sfx}")
+                fi = ticker.fast_info
+
+                last_price = fi.last_price
+                prev_close = fi.previous_close
+                if not last_price:
+                    # 慢速備援：完整 info
+                    info = ticker.info
+                    last_price = info.get('regularMarketPrice')
+                    prev_close = info.get('previousClose')
+                    if not last_price:
+                        continue
+                    quote = {
+                        '開盤價': info.get('regularMarketOpen') or last_price,
+                        '最高價': info.get('regularMarketDayHigh') or last_price,
+                        '最低價': info.get('regularMarketDayLow') or last_price,
+                        '成交量': info.get('regularMarketVolume') or 0,
+                    }
+                else:
+                    quote = {
+                        '開盤價': fi.open or last_price,
+                        '最高價': fi.day_high or last_price,
+                        '最低價': fi.day_low or last_price,
+                        '成交量': fi.last_volume or 0,
+                    }
+
+                self._suffix_hint[stock_id] = sfx
+                prev_close = prev_close or last_price
+                change = last_price - prev_close
+                change_pct = (change / prev_close) * 100 if prev_close > 0 else 0
+
+                result = {
+                    '股票代碼': stock_id,
+                    '股票名稱': _STOCK_NAMES.get(stock_id, stock_id),
+                    '當前價格': float(last_price),
+                    '開盤價': float(quote['開盤價']),
+                    '最高價': float(quote['最高價']),
+                    '最低價': float(quote['最低價']),
+                    '昨收價': float(prev_close),
+                    '成交量': int(quote['成交量']),
+                    '漲跌': round(change, 2),
+                    '漲跌幅': round(change_pct, 2),
+                    '時間': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    '資料來源': 'Yahoo Finance',
+                }
+                with self._cache_lock:
+                    self._quote_cache[stock_id] = result
+                return dict(result)
+            except Exception:
+                continue
+
+        return {}
 
     def get_top_stocks(self, limit: int = 10) -> List[Dict]:
         """
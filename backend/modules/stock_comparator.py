@@ -37,9 +37,15 @@ class StockComparator:
         stocks_data = {}
         comparison_metrics = []
 
+        # 資料獲取器支援多檔並行下載時，一次取回所有股票
+        fetch_many = getattr(self.data_fetcher, 'get_stock_prices', None)
+        prefetched = fetch_many(stock_ids, days=days) if fetch_many else {}
+
         for stock_id in stock_ids:
             # 獲取股票資料
-            df = self.data_fetcher.get_stock_price(stock_id, days=days)
+            df = prefetched.get(stock_id)
+            if df is None:
+                df = self.data_fetcher.get_stock_price(stock_id, days=days)
             if df.empty:
                 continue
 
@@ -0,0 +1,14 @@
+"""
+共用執行緒池
+
+各資料獲取器的並行網路請求共用同一組執行緒池，匯入多個模組也只會建立一次。
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+# 並行網路請求（多檔查詢、分批 API）；提交到此池的工作不可再等待
+# 同一個池的其他工作，以免互相卡住
+IO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix='stock-io')
+
+# 過期價格快取的背景更新另用小型執行緒池，不佔用前景請求的名額
+REFRESH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='price-refresh')
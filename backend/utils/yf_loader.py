@@ -0,0 +1,25 @@
+"""
+yfinance 延遲載入
+
+yfinance 匯入成本高，各資料獲取器共用同一個載入點，到第一次線上查詢才匯入。
+"""
+
+import warnings
+
+# None：尚未載入，False：無法使用
+_yf = None
+
+
+def get_yf():
+    """回傳 yfinance 模組，首次呼叫時才匯入；無法使用時回傳 None"""
+    global _yf
+    if _yf is None:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                import yfinance
+        except Exception:
+            _yf = False
+        else:
+            _yf = yfinance
+    return _yf or None
@@ -179,6 +179,757 @@ class TestWarrantDataFetcher:
         result = fetcher.get_warrant_list('9999')
         assert result.empty
 
+    def test_extract_warrants(self):
+        """測試由頁面取出內嵌的權證列表"""
+        from backend.modules.data_fetcher import _extract_warrants
+
+        # 巢狀的 '}]' 不會提早截斷
+        page = 'x = {"warrants":[{"symbol":"03001P.TW","tags":[{"k":1}]},' \
+               '{"symbol":"03002Q.TW","name":"a}]b"}],"next":[1]};'
+        assert _extract_warrants(page) == [
+            {'symbol': '03001P.TW', 'tags': [{'k': 1}]},
+            {'symbol': '03002Q.TW', 'name': 'a}]b'},
+        ]
+
+        # 找不到起點或資料不完整時回傳 None
+        assert _extract_warrants('<html>no data</html>') is None
+        assert _extract_warrants('{"warrants":[{"symbol":"03001P.TW"},{"sym') is None
+
+    def test_issuer_of(self):
+        """測試由權證名稱解析發行商：含多個簡稱時取位置最後者"""
+        from backend.modules.data_fetcher import _issuer_of
+
+        assert _issuer_of('台積電群益51購26') == '群益證券'
+        # 標的名稱含其他發行商簡稱
+        assert _issuer_of('國泰金凱基52售03') == '凱基證券'
+        assert _issuer_of('元大金國泰51購01') == '國泰證券'
+        assert _issuer_of('富邦金元大53購02') == '元大證券'
+        assert _issuer_of('台積電51購01') == '未知'
+
+    def test_warrant_list_from_mocked_api(self, fetcher, monkeypatch):
+        """測試以 Yahoo 權證頁面與證交所報價組出的權證列表（不連線）"""
+        import json
+
+        expiry = (pd.Timestamp.now(tz='Asia/Taipei').tz_localize(None).normalize()
+                  + pd.Timedelta(days=30))
+        page = '<script>root.App.main = {"warrants":[' \
+               '{"symbol":"03001P.TW","name":"台積電凱基51購01"},' \
+               '{"symbol":"03002Q.TW","name":"台積電元大52售02"}]};</script>'
+        twse = {'rtcode': '0000', 'msgArray': [{
+            'c': '03001P', 'z': '1.25', 'y': '1.20', 'u': '1.50', 'w': '0.90',
+            'v': '350', 'h': '1.30', 'l': '1.10', 'o': '1.15', 'rn': '台積電', 'rch': '2330',
+            'nf': f"台積電凱基51購01－台積電 {expiry:%Y%m%d}美購",
+        }]}
+        urls = []
+
+        class FakeResponse:
+            def __init__(self, text):
+                self.text = text
+                self.content = text.encode()
+
+            def raise_for_status(self):
+                pass
+
+        def fake_get(url, **kwargs):
+            urls.append(url)
+            return FakeResponse(page if 'yahoo' in url else json.dumps(twse))
+
+        monkeypatch.setattr(fetcher._session, 'get', fake_get)
+        df = fetcher.get_warrant_list('2330')
+
+        assert list(df.columns) == [
+            '權證代碼', '權證名稱', '標的股票', '發行商', '權證類型', '行使比例', '履約價',
+            '到期日', '隱含波動率', '權證價格', '昨收價', '漲停價', '跌停價', '成交量', '剩餘天數',
+        ]
+        assert df['權證代碼'].tolist() == ['03001P', '03002Q']
+        assert df['發行商'].tolist() == ['凱基證券', '元大證券']
+        assert df['權證類型'].tolist() == ['認購', '認售']
+        assert df['到期日'].tolist() == [f"{expiry:%Y-%m-%d}", '']
+        assert df['剩餘天數'].dtype == 'Int32'
+        assert df['剩餘天數'].iloc[0] == 30 and pd.isna(df['剩餘天數'].iloc[1])
+        assert pd.api.types.is_float_dtype(df['權證價格'])
+        assert df['權證價格'].tolist() == [1.25, 0]
+        assert len(urls) == 2
+
+        # 有證交所報價的權證直接由同一批資料提供詳情，不再連線
+        detail = fetcher.get_warrant_detail('03001P')
+        assert detail['標的名稱'] == '台積電' and detail['最高價'] == 1.30
+        assert detail['剩餘天數'] == 30
+        assert len(urls) == 2
+
+
+class TestTaiwanStockDataFetcher:
+    """股票資料獲取器測試（以假的 yfinance 下載取代網路）"""
+
+    @pytest.fixture
+    def download_calls(self, monkeypatch):
+        from backend.modules import data_fetcher
+
+        calls = []
+
+        class FakeTicker:
+            def __init__(self, symbol, *args, **kwargs):
+                self.symbol = symbol
+                self.info = {}
+
+            def history(self, start, end, **kwargs):
+                calls.append((self.symbol, pd.Timestamp(start), pd.Timestamp(end)))
+                # 與 Yahoo 相同以台北時間標記K線日期；每天都有K線，
+                # 測試結果不受執行當天是否為週末影響
+                start, end = (pd.Timestamp(t.timestamp(), unit='s', tz='Asia/Taipei')
+                              for t in (start, end))
+                dates = pd.date_range(start.normalize(), end)
+                n = len(dates)
+                return pd.DataFrame({
+                    'Open': np.full(n, 100.0),
+                    'High': np.full(n, 101.0),
+                    'Low': np.full(n, 99.0),
+                    'Close': np.full(n, 100.5),
+                    'Volume': np.full(n, 1000),
+                }, index=dates)
+
+        monkeypatch.setattr(data_fetcher._get_yf(), 'Ticker', FakeTicker)
+        return calls
+
+    @pytest.fixture
+    def fetcher(self, tmp_path):
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+        return TaiwanStockDataFetcher(cache_dir=str(tmp_path))
+
+    def test_incremental_history(self, fetcher, download_calls, tmp_path, monkeypatch):
+        """測試價格歷史只補抓缺少的區間"""
+        from backend.modules import data_fetcher
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        # 視為盤中：今天的K線尚未收定
+        monkeypatch.setattr(data_fetcher, '_last_market_close', lambda now: now)
+        df = fetcher.get_stock_price('2330', days=30)
+        assert len(df) == 30
+        assert len(download_calls) == 1
+        assert fetcher._suffix_cache == {'2330': '.TW'}
+
+        # 較短的區間直接由同一份快取切出
+        assert len(fetcher.get_stock_price('2330', days=5)) == 5
+        df = fetcher.get_stock_price('2330', days=120)
+        assert df.index[0] >= pd.Timestamp((datetime.now() - timedelta(days=150)).date())
+        assert len(download_calls) == 1
+
+        # 超出已下載範圍時只補抓前段，並重抓最後一天
+        fetcher.get_stock_price('2330', days=500)
+        assert len(download_calls) == 3
+        assert download_calls[1][2] == download_calls[0][1].normalize()
+        assert (download_calls[2][2] - download_calls[2][1]).days < 2
+
+        # 重新啟動後由 Parquet 檔沿用
+        assert (tmp_path / 'prices' / '2330.parquet').exists()
+        restarted = TaiwanStockDataFetcher(cache_dir=str(tmp_path))
+        df = restarted.get_stock_price('2330', days=100)
+        assert not df.empty
+        assert len(download_calls) == 4
+        assert restarted._suffix_cache == {'2330': '.TW'}
+
+        # 收盤後已同步過的資料不再補抓尾段
+        monkeypatch.setattr(data_fetcher, '_last_market_close',
+                            lambda now: now - timedelta(days=1))
+        restarted = TaiwanStockDataFetcher(cache_dir=str(tmp_path))
+        assert not restarted.get_stock_price('2330', days=100).empty
+        assert len(download_calls) == 4
+
+        # 強制更新：略過快取並重抓最後一天
+        assert not restarted.get_stock_price('2330', days=100, force_refresh=True).empty
+        assert len(download_calls) == 5
+
+    def test_failed_download_retried(self, fetcher, download_calls, tmp_path, monkeypatch):
+        """測試補抓失敗的區間不記為已涵蓋，之後會重新下載"""
+        from backend.modules import data_fetcher
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        monkeypatch.setattr(data_fetcher, '_last_market_close', lambda now: now)
+        assert len(fetcher.get_stock_price('2330', days=30)) == 30
+        first_start = download_calls[0][1]
+
+        # 補抓前段時 Yahoo 回傳空結果（逾時、限流等）
+        yf = data_fetcher._get_yf()
+        fake_ticker = yf.Ticker
+
+        class EmptyTicker(fake_ticker):
+            def history(self, start, end, **kwargs):
+                super().history(start, end, **kwargs)
+                return pd.DataFrame()
+
+        monkeypatch.setattr(yf, 'Ticker', EmptyTicker)
+        df = fetcher.get_stock_price('2330', days=500)
+        assert df.index[0] >= first_start.normalize()
+
+        # 重新啟動後仍會補抓該區間
+        monkeypatch.setattr(yf, 'Ticker', fake_ticker)
+        calls_before = len(download_calls)
+        restarted = TaiwanStockDataFetcher(cache_dir=str(tmp_path))
+        df = restarted.get_stock_price('2330', days=500)
+        assert any(call[1] < first_start for call in download_calls[calls_before:])
+        assert df.index[0] < first_start.normalize()
+
+    def test_failed_tail_not_synced(self, fetcher, download_calls, monkeypatch):
+        """測試尾段下載失敗時不標記為已同步，下次查詢仍會補抓"""
+        from backend.modules import data_fetcher
+
+        monkeypatch.setattr(data_fetcher, '_last_market_close',
+                            lambda now: now - timedelta(days=1))
+        assert not fetcher.get_stock_price('2330', days=30).empty
+        # 視為前一天同步的資料，收盤後需補抓尾段
+        fetcher._history['2330'][1].pop('synced')
+        fetcher._cache.clear()
+
+        yf = data_fetcher._get_yf()
+        fake_ticker = yf.Ticker
+
+        class EmptyTicker(fake_ticker):
+            def history(self, start, end, **kwargs):
+                super().history(start, end, **kwargs)
+                return pd.DataFrame()
+
+        monkeypatch.setattr(yf, 'Ticker', EmptyTicker)
+        assert not fetcher.get_stock_price('2330', days=30).empty
+        calls_before = len(download_calls)
+        assert calls_before > 1
+
+        monkeypatch.setattr(yf, 'Ticker', fake_ticker)
+        fetcher._cache.clear()
+        assert not fetcher.get_stock_price('2330', days=30).empty
+        assert len(download_calls) == calls_before + 1
+        assert 'synced' in fetcher._history['2330'][1]
+
+    def test_history_bounded(self, download_calls, tmp_path, monkeypatch):
+        """測試記憶體中的價格歷史有上限，淘汰後由 Parquet 檔讀回"""
+        from backend.modules import data_fetcher
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        monkeypatch.setattr(data_fetcher, '_last_market_close',
+                            lambda now: now - timedelta(days=1))
+        monkeypatch.setattr(TaiwanStockDataFetcher, 'HISTORY_MAX_ENTRIES', 1)
+        fetcher = TaiwanStockDataFetcher(cache_dir=str(tmp_path))
+        assert not fetcher.get_stock_price('2330', days=30).empty
+        assert not fetcher.get_stock_price('2317', days=30).empty
+        assert list(fetcher._history) == ['2317']
+
+        fetcher._cache.clear()
+        assert not fetcher.get_stock_price('2330', days=30).empty
+        assert len(download_calls) == 2
+
+    def test_missing_stock_not_refetched(self, fetcher, download_calls, monkeypatch):
+        """測試查無資料的代碼短時間內不再連線"""
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        calls = []
+
+        def fake_download(self, stock_id, *args, **kwargs):
+            calls.append(stock_id)
+            return pd.DataFrame()
+
+        monkeypatch.setattr(TaiwanStockDataFetcher, '_download', fake_download)
+        assert fetcher.get_stock_price('9998').empty
+        assert fetcher.get_stock_price('9998', days=5).empty
+        assert len(calls) == 1
+
+        # 強制更新仍會重新查詢
+        assert fetcher.get_stock_price('9998', force_refresh=True).empty
+        assert len(calls) == 2
+
+    def test_stale_price_refreshed_in_background(self, fetcher, download_calls):
+        """測試過期的價格快取先回傳舊資料，再於背景更新"""
+        import time
+
+        assert not fetcher.get_stock_price('2330', days=10).empty
+        start, df, _ = fetcher._cache['price_2330_max']
+        stale_at = time.monotonic() - fetcher.CACHE_TTL - 1
+        fetcher._cache['price_2330_max'] = (start, df, stale_at)
+
+        assert not fetcher.get_stock_price('2330', days=10).empty
+        deadline = time.monotonic() + 5
+        while fetcher._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert fetcher._cache['price_2330_max'][2] > stale_at
+
+    def test_quote_from_intraday_data_not_reused(self, fetcher, download_calls, monkeypatch):
+        """測試收盤前下載的價格所組出的報價，收盤後不當作收盤報價沿用"""
+        import time
+        from backend.modules import data_fetcher
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        monkeypatch.setattr(TaiwanStockDataFetcher, 'is_market_open', lambda self: False)
+        monkeypatch.setattr(data_fetcher, '_last_market_close',
+                            lambda now: now - timedelta(minutes=1))
+
+        # 價格資料在收盤前（兩分鐘前）下載
+        assert not fetcher.get_stock_price('2330', days=5).empty
+        start, df, _ = fetcher._cache['price_2330_max']
+        fetcher._cache['price_2330_max'] = (start, df, time.monotonic() - 120)
+        assert fetcher.get_realtime_price('2330')
+        assert fetcher._cached_quote('2330') is None
+
+        # 收盤後下載的資料組出的報價可沿用
+        assert fetcher.get_realtime_price('2317')
+        assert fetcher._cached_quote('2317')['股票代碼'] == '2317'
+
+    def test_get_stock_price_soa(self, fetcher, download_calls):
+        """測試欄位陣列版本與 DataFrame 一致"""
+        df = fetcher.get_stock_price('2330', days=20)
+        soa = fetcher.get_stock_price_soa('2330', days=20)
+        assert set(soa) == {'date', 'open', 'high', 'low', 'close', 'volume'}
+        assert soa['close'].dtype == np.float64 and soa['close'].flags['C_CONTIGUOUS']
+        np.testing.assert_array_equal(soa['close'], df['收盤價'].to_numpy())
+        assert (soa['date'] == df.index.to_numpy()).all()
+        assert fetcher.get_stock_price_soa('bad') == {}
+
+    def test_get_stock_prices_parallel(self, fetcher, download_calls):
+        """測試多檔並行下載"""
+        frames = fetcher.get_stock_prices(['2330', '2317', '2330', 'bad'], days=20)
+        assert list(frames) == ['2330', '2317', 'bad']
+        assert len(frames['2330']) == 20 and len(frames['2317']) == 20
+        assert frames['bad'].empty
+        assert sorted(c[0] for c in download_calls) == ['2317.TW', '2330.TW']
+
+    def test_invalid_stock_id(self, fetcher, download_calls):
+        """測試格式錯誤的代碼不發出請求"""
+        assert fetcher.get_stock_price('abc').empty
+        assert fetcher.get_stock_price('2330\n').empty
+        assert fetcher.get_realtime_price('') == {}
+        assert fetcher.get_stock_info('2330.TW') == {}
+        assert download_calls == []
+
+    def test_is_known_stock(self, fetcher):
+        """測試已收錄代碼查詢"""
+        assert fetcher.is_known_stock('2330')
+        assert not fetcher.is_known_stock('9999')
+
+    def test_list_stocks(self, fetcher):
+        """測試依產業篩選股票"""
+        semis = fetcher.list_stocks(industry='半導體')
+        assert '2330' in semis.index and '2317' not in semis.index
+        assert (semis['sector'] == '科技業').all()
+        assert len(fetcher.list_stocks()) == len(fetcher.stock_info_db)
+        assert fetcher.list_stocks(sector='不存在').empty
+        assert semis['industry'].dtype == 'category'
+
+    def test_stock_info_persisted(self, fetcher, download_calls, tmp_path):
+        """測試股票資訊寫入 SQLite 並於重啟後沿用"""
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        info = fetcher.get_stock_info('2330')
+        assert info['公司名稱'] == '台積電'
+        assert info['當前價格'] == 100.5
+        calls = len(download_calls)
+
+        restarted = TaiwanStockDataFetcher(cache_dir=str(tmp_path))
+        assert restarted.get_stock_info('2330') == info
+        assert len(download_calls) == calls
+
+    def test_get_stock_infos_parallel(self, fetcher, download_calls):
+        """測試多檔股票資訊並行查詢"""
+        infos = fetcher.get_stock_infos(['2330', '2317', '2330', 'bad'])
+        assert list(infos) == ['2330', '2317', 'bad']
+        assert infos['2330']['公司名稱'] == '台積電'
+        assert infos['2317']['公司名稱'] == '鴻海'
+        assert infos['bad'] == {}
+
+    def test_fundamentals_cached(self, fetcher, monkeypatch):
+        """測試基本面欄位只向 Yahoo 查詢一次"""
+        from backend.modules import data_fetcher
+
+        info_calls = []
+
+        class InfoTicker:
+            def __init__(self, symbol, *args, **kwargs):
+                info_calls.append(symbol)
+                self.info = {'regularMarketPrice': 100.5, 'trailingPE': 15.234,
+                             'marketCap': 2.5e13, 'longBusinessSummary': '...'}
+
+        monkeypatch.setattr(data_fetcher._get_yf(), 'Ticker', InfoTicker)
+        first = fetcher._get_fundamentals('2330')
+        assert first == {'trailingPE': 15.234, 'priceToBook': None,
+                         'marketCap': 2.5e13, 'dividendYield': None}
+        assert fetcher._get_fundamentals('2330') == first
+        assert info_calls == ['2330.TW']
+
+    def test_info_error_falls_back_to_prices(self, fetcher, download_calls, monkeypatch):
+        """測試 Yahoo info 發生非預期錯誤時，仍以股價資料回傳股票資訊"""
+        from backend.modules import data_fetcher
+
+        yf = data_fetcher._get_yf()
+
+        class BrokenInfoTicker(yf.Ticker):
+            @property
+            def info(self):
+                raise AttributeError('unexpected payload')
+
+            @info.setter
+            def info(self, value):
+                pass
+
+        monkeypatch.setattr(yf, 'Ticker', BrokenInfoTicker)
+        info = fetcher.get_stock_info('2330')
+        assert info['當前價格'] == 100.5
+        assert info['本益比'] == 'N/A' and info['市值'] == 'N/A'
+
+    def test_etf_info_skips_fundamentals(self, fetcher, download_calls, monkeypatch):
+        """測試 ETF 不查詢 Yahoo 基本面"""
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        looked_up = []
+        monkeypatch.setattr(TaiwanStockDataFetcher, '_get_fundamentals',
+                            lambda self, sid: looked_up.append(sid) or {})
+        info = fetcher.get_stock_info('0050')
+        assert info['產業類別'] == 'ETF' and info['當前價格'] == 100.5
+        assert info['本益比'] == 'N/A'
+        fetcher.get_stock_info('2330')
+        assert looked_up == ['2330']
+
+    def test_top_stocks_batch(self, fetcher, download_calls, monkeypatch):
+        """測試熱門股票以一次多檔下載取得"""
+        from backend.modules import data_fetcher
+
+        batch_calls = []
+
+        def fake_download(symbols, **kwargs):
+            batch_calls.append(list(symbols))
+            dates = pd.bdate_range(end=datetime.now(), periods=3)
+            fields = {'Open': 100.0, 'High': 101.0, 'Low': 99.0, 'Close': 100.5, 'Volume': 1000}
+            # 2454 假設為上櫃股，.TW 查無資料
+            data = {(sym, f): np.full(3, np.nan if sym == '2454.TW' else v)
+                    for sym in symbols for f, v in fields.items()}
+            return pd.DataFrame(data, index=dates)
+
+        monkeypatch.setattr(data_fetcher._get_yf(), 'download', fake_download)
+
+        result = fetcher.get_top_stocks(limit=3)
+        assert [r['股票代碼'] for r in result] == ['2330', '2317', '2454']
+        assert batch_calls == [['2330.TW', '2317.TW', '2454.TW'], ['2454.TWO']]
+        assert fetcher._suffix_cache['2454'] == '.TWO'
+        assert result[0]['漲跌'] == 0
+
+        # 批次結果已寫入單檔快取
+        assert fetcher.get_realtime_price('2317')['當前價格'] == 100.5
+        assert download_calls == []
+
+    def test_top_stocks_from_synced_history(self, fetcher, download_calls, monkeypatch, tmp_path):
+        """測試收盤後已同步的本機歷史直接用於熱門股票"""
+        from backend.modules import data_fetcher
+        from backend.modules.data_fetcher import TaiwanStockDataFetcher
+
+        monkeypatch.setattr(data_fetcher, '_last_market_close',
+                            lambda now: now - timedelta(days=1))
+        assert not fetcher.get_stock_price('2330', days=30).empty
+
+        def unexpected_download(symbols, **kwargs):
+            raise AssertionError('不應連線')
+
+        monkeypatch.setattr(data_fetcher._get_yf(), 'download', unexpected_download)
+        restarted = TaiwanStockDataFetcher(cache_dir=str(tmp_path))
+        result = restarted.get_top_stocks(limit=1)
+        assert result[0]['當前價格'] == 100.5
+        assert len(download_calls) == 1
+
+    def test_top_stocks_batch_failure(self, fetcher, download_calls, monkeypatch):
+        """測試批次下載失敗時改為逐檔查詢"""
+        from backend.modules import data_fetcher
+
+        def failing_download(symbols, **kwargs):
+            raise OSError('connection reset')
+
+        monkeypatch.setattr(data_fetcher._get_yf(), 'download', failing_download)
+
+        result = fetcher.get_top_stocks(limit=3)
+        assert [r['股票代碼'] for r in result] == ['2330', '2317', '2454']
+        assert sorted(c[0] for c in download_calls) == ['2317.TW', '2330.TW', '2454.TW']
+
+
+class TestEnhancedStockDataFetcher:
+    """增強版資料獲取器測試（以假的 cache_manager 與 yf.download 取代網路）"""
+
+    @pytest.fixture
+    def cache(self, monkeypatch):
+        from backend.modules import data_fetcher_enhanced
+
+        class FakeCache:
+            def __init__(self):
+                self.data = {}
+
+            def get(self, key):
+                return self.data.get(key)
+
+            def set(self, key, data, ttl=None):
+                self.data[key] = data
+
+            def delete(self, key):
+                return self.data.pop(key, None) is not None
+
+        fake = FakeCache()
+        monkeypatch.setattr(data_fetcher_enhanced, 'cache_manager', fake)
+        return fake
+
+    @pytest.fixture
+    def downloads(self, monkeypatch):
+        """記錄 yf.download 呼叫；close 為回傳的收盤價，None 表示查無資料"""
+        from backend.modules import data_fetcher_enhanced
+
+        state = {'calls': [], 'close': 100.0}
+
+        def fake_download(ticker, start=None, end=None, **kwargs):
+            state['calls'].append(ticker)
+            if state['close'] is None:
+                return pd.DataFrame()
+            dates = pd.date_range(end=datetime.now(), periods=(end - start).days)
+            n = len(dates)
+            return pd.DataFrame({
+                'Open': np.full(n, 99.0), 'High': np.full(n, 101.0), 'Low': np.full(n, 98.0),
+                'Close': np.full(n, state['close']), 'Volume': np.full(n, 1000.0),
+            }, index=dates)
+
+        monkeypatch.setattr(data_fetcher_enhanced.yf, 'download', fake_download)
+        return state
+
+    @pytest.fixture
+    def fetcher(self, cache):
+        from backend.modules.data_fetcher_enhanced import EnhancedTaiwanStockDataFetcher
+
+        fetcher = EnhancedTaiwanStockDataFetcher()
+        fetcher.use_cache = True
+        fetcher.cache_ttl = 300
+        fetcher.max_retries = 1
+        return fetcher
+
+    def test_stale_price_refreshed_once(self, fetcher, cache, downloads, monkeypatch):
+        """測試過期快取先回傳舊資料，同一檔只送出一次背景更新，完成後取代快取"""
+        import threading
+        import time
+        from backend.modules import data_fetcher_enhanced
+        from backend.modules.data_fetcher_enhanced import _cache_key
+
+        assert fetcher.get_stock_price('2330', days=30)['收盤價'].iloc[-1] == 100.0
+        key = _cache_key('price', '2330')
+        window, df, _ = cache.get(key)
+        cache.set(key, (window, df, time.monotonic() - fetcher.cache_ttl - 1))
+
+        # 背景更新在放行前停住，確認期間的查詢都直接回傳舊資料
+        release = threading.Event()
+        fake_download = data_fetcher_enhanced.yf.download
+
+        def slow_download(*args, **kwargs):
+            release.wait(5)
+            return fake_download(*args, **kwargs)
+
+        monkeypatch.setattr(data_fetcher_enhanced.yf, 'download', slow_download)
+        downloads['close'] = 200.0
+        for _ in range(3):
+            assert fetcher.get_stock_price('2330', days=30)['收盤價'].iloc[-1] == 100.0
+        release.set()
+
+        deadline = time.monotonic() + 5
+        while fetcher._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert downloads['calls'] == ['2330.TW', '2330.TW']
+        assert cache.get(key)[1]['收盤價'].iloc[-1] == 200.0
+        assert fetcher.get_stock_price('2330', days=30)['收盤價'].iloc[-1] == 200.0
+
+    def test_failed_known_suffix_forgotten(self, fetcher, cache, downloads):
+        """測試已知市場查無資料時清除記錄，下次兩個後綴都嘗試"""
+        from backend.modules.data_fetcher_enhanced import _cache_key
+
+        fetcher._remember_suffix('6488', '.TWO')
+        assert cache.get(_cache_key('meta', '6488')) == '.TWO'
+
+        downloads['close'] = None
+        assert fetcher._try_online('6488', 30).empty
+        assert downloads['calls'] == ['6488.TWO']
+        assert '6488' not in fetcher._suffix_hint
+        assert cache.get(_cache_key('meta', '6488')) is None
+
+        fetcher._try_online('6488', 30)
+        assert downloads['calls'][1:] == ['6488.TW', '6488.TWO']
+
+    def test_unknown_symbol_not_retried_within_miss_ttl(self, fetcher, cache, downloads):
+        """測試重試用盡查無資料後，MISS_TTL 內不再重試，直接使用參考資料"""
+        from backend.modules.data_fetcher_enhanced import _cache_key
+
+        fetcher.max_retries = 2
+        fetcher.retry_delay = 0
+        fetcher.use_cache = False
+        downloads['close'] = None
+
+        assert not fetcher.get_stock_price('9999', days=30).empty
+        assert downloads['calls'] == ['9999.TW', '9999.TWO'] * 2
+        assert not fetcher.get_stock_price('9999', days=30).empty
+        assert len(downloads['calls']) == 4
+
+        # 其他實例經由共用快取得知查無資料
+        fetcher.use_cache = True
+        fetcher._try_online_with_retry('8888', 30)
+        assert cache.get(_cache_key('miss', '8888'))
+        fetcher._misses.clear()
+        assert fetcher._try_online_with_retry('8888', 30).empty
+        assert len(downloads['calls']) == 8
+
+    def test_unversioned_cache_keys_ignored(self, fetcher, cache, downloads):
+        """測試舊格式的快取鍵不會被讀取"""
+        stale = pd.DataFrame({'收盤價': [1.0]})
+        cache.set('stock_price_2330', (400, stale))
+        cache.set('stock:price:2330:v1', (400, stale))
+
+        df = fetcher.get_stock_price('2330', days=30)
+        assert df['收盤價'].iloc[-1] == 100.0
+        assert downloads['calls'] == ['2330.TW']
+        assert 'stock:price:2330:v2' in cache.data
+
+
+class TestUltimateStockDataFetcher:
+    """終極版資料獲取器測試（以假的 yfinance 取代網路）"""
+
+    @pytest.fixture
+    def yf(self, monkeypatch):
+        """記錄 download 與 Ticker.info 的呼叫；close 為回傳的收盤價"""
+        from types import SimpleNamespace
+        from backend.modules import data_fetcher_ultimate
+
+        class FakeYF:
+            def __init__(self):
+                self.downloads = []
+                self.info_calls = []
+                self.close = 100.0
+                self.otc = set()  # 只在 .TWO 查得到的代碼
+
+            def download(self, ticker, start=None, end=None, **kwargs):
+                self.downloads.append(ticker)
+                sid, sfx = ticker.split('.')
+                if (sid in self.otc) != (sfx == 'TWO'):
+                    return pd.DataFrame()
+                dates = pd.date_range(end=end, periods=(end - start).days)
+                n = len(dates)
+                return pd.DataFrame({
+                    'Open': np.full(n, 99.0), 'High': np.full(n, 101.0), 'Low': np.full(n, 98.0),
+                    'Close': np.full(n, self.close), 'Volume': np.full(n, 1000.0),
+                }, index=dates)
+
+            def Ticker(self, symbol):
+                fake = self
+
+                class FakeTicker:
+                    @property
+                    def info(self):
+                        fake.info_calls.append(symbol)
+                        return {'regularMarketPrice': fake.close, 'trailingPE': 20.0}
+
+                    @property
+                    def fast_info(self):
+                        fake.info_calls.append(symbol)
+                        return SimpleNamespace(last_price=fake.close, previous_close=fake.close,
+                                               open=None, day_high=None, day_low=None,
+                                               last_volume=1000)
+
+                return FakeTicker()
+
+        fake = FakeYF()
+        monkeypatch.setattr(data_fetcher_ultimate, 'get_yf', lambda: fake)
+        return fake
+
+    @pytest.fixture
+    def fetcher(self, yf):
+        from backend.modules.data_fetcher_ultimate import UltimateTaiwanStockDataFetcher
+
+        fetcher = UltimateTaiwanStockDataFetcher()
+        fetcher.finmind_fetcher = None
+        fetcher.rate_limiter.wait_if_needed = lambda: None
+        return fetcher
+
+    @pytest.fixture
+    def clock(self, fetcher):
+        """以可手動推進的時鐘重建三個 TTL 快取"""
+        from cachetools import TTLCache
+
+        now = [0.0]
+
+        def timer():
+            return now[0]
+
+        size = fetcher.CACHE_MAX_ENTRIES
+        fetcher._info_cache = TTLCache(size, fetcher.INFO_CACHE_TTL, timer=timer)
+        fetcher._price_cache = TTLCache(size, fetcher.PRICE_CACHE_TTL, timer=timer)
+        fetcher._quote_cache = TTLCache(size, fetcher.PRICE_CACHE_TTL, timer=timer)
+        return now
+
+    def test_price_cache_ttl(self, fetcher, yf, clock):
+        """測試 TTL 內命中快取不重新下載，過期後重新下載"""
+        fetcher.get_stock_price('2330', days=30)
+        clock[0] += fetcher.PRICE_CACHE_TTL - 1
+        fetcher.get_stock_price('2330', days=30)
+        assert yf.downloads == ['2330.TW']
+
+        clock[0] += 2
+        yf.close = 200.0
+        assert fetcher.get_stock_price('2330', days=30)['收盤價'].iloc[-1] == 200.0
+        assert yf.downloads == ['2330.TW', '2330.TW']
+
+    def test_info_and_quote_cache_ttl(self, fetcher, yf, clock):
+        """測試股票資訊與即時報價在各自 TTL 內只查詢一次"""
+        fetcher.get_stock_info('2330')
+        fetcher.get_realtime_price('2330')
+        clock[0] += fetcher.PRICE_CACHE_TTL - 1
+        fetcher.get_stock_info('2330')
+        fetcher.get_realtime_price('2330')
+        assert yf.info_calls == ['2330.TW', '2330.TW']
+
+        # 報價過期、資訊仍有效
+        clock[0] += 2
+        fetcher.get_stock_info('2330')
+        fetcher.get_realtime_price('2330')
+        assert len(yf.info_calls) == 3
+
+        clock[0] += fetcher.INFO_CACHE_TTL
+        fetcher.get_stock_info('2330')
+        assert len(yf.info_calls) == 4
+
+    def test_cached_results_are_copies(self, fetcher, yf):
+        """測試修改回傳結果不會改到快取內容"""
+        df = fetcher.get_stock_price('2330', days=30)
+        df.loc[df.index[-1], '收盤價'] = -1.0
+        df['新欄位'] = 0
+        cached = fetcher.get_stock_price('2330', days=30)
+        assert cached['收盤價'].iloc[-1] == 100.0
+        assert '新欄位' not in cached
+
+        info = fetcher.get_stock_info('2330')
+        info['當前價格'] = -1.0
+        assert fetcher.get_stock_info('2330')['當前價格'] == 100.0
+
+        quote = fetcher.get_realtime_price('2330')
+        quote['當前價格'] = -1.0
+        assert fetcher.get_realtime_price('2330')['當前價格'] == 100.0
+        assert len(yf.downloads) == 1
+
+    def test_suffix_hint(self, fetcher, yf):
+        """測試上櫃股票查詢成功後，之後優先嘗試 .TWO"""
+        yf.otc.add('6488')
+        assert fetcher._suffixes('6488') == ['.TW', '.TWO']
+        assert not fetcher.get_stock_price('6488', days=30).empty
+        assert yf.downloads == ['6488.TW', '6488.TWO']
+        assert fetcher._suffix_hint['6488'] == '.TWO'
+        assert fetcher._suffixes('6488') == ['.TWO', '.TW']
+
+        fetcher.get_stock_price('6488', days=60)
+        assert yf.downloads[2:] == ['6488.TWO']
+
+    def test_etf_info_skips_ticker_info(self, fetcher, yf):
+        """測試 ETF 不呼叫 Ticker.info，價格與 52 週高低取自歷史股價"""
+        info = fetcher.get_stock_info('0050')
+        assert yf.info_calls == []
+        assert yf.downloads == ['0050.TW']
+        assert info['產業類別'] == 'ETF'
+        assert info['當前價格'] == 100.0
+        assert info['52週最高'] == '101.00'
+        assert info['本益比'] == 'N/A'
+
+        fetcher.get_stock_info('2330')
+        assert yf.info_calls == ['2330.TW']
+
 
 class TestStockComparator:
     """多股比較模組測試"""